@@ -0,0 +1,155 @@
+import csv
+import mmap
+import os
+import struct
+
+from i18n import LANG_CODES
+from vocab_index import normalize_word
+
+# ==== ローカル辞書（読み取り専用・メモリマップ） ====
+# 対訳の単語リスト（TSV、1行 = 1つの意味、列 = 言語コード）から、
+# 「正規化した単語 + 言語」でソートした表を1ファイルに書き出しておき、mmap して二分探索で引く。
+# 引くたびにファイル全体を読むことはなく、1回の検索はメモリ上の数十バイトの比較で終わる。
+#
+# 単語リストを差し替えて作り直す:
+#   python dictionary.py build --seed my_words.tsv
+#   python dictionary.py lookup 学校 --lang ja
+
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "dictionary_seed.tsv")
+DICTIONARY_INDEX = "dictionary.idx"
+
+MAGIC = b"LXDICT1\n"
+CODES = tuple(LANG_CODES.values())
+
+# ファイルの形:
+#   MAGIC | 言語コード（"en,ja,zh,ko,es\n"）| 件数 N（uint32）| 位置 N+1 個（uint32）| レコード × N
+# レコード = "単語\x1f言語\t訳(CODES の順、無ければ空)\t…"（UTF-8）
+_COUNT = struct.Struct("<I")
+
+
+def read_seed(path):
+    # 戻り値: {言語コード: 単語} の並び（1行 = 1つの意味）
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            yield {code: (row.get(code) or "").strip() for code in CODES}
+
+
+def _entries(rows):
+    # (単語, 言語) ごとに、同じ行のほかの言語の訳をまとめる。同じ単語が何度も出たら先の行を優先する
+    entries = {}
+    for row in rows:
+        for lang, word in row.items():
+            key = normalize_word(word)
+            if not key:
+                continue
+            backs = entries.setdefault(f"{key}\x1f{lang}".encode("utf-8"), {})
+            for code, text in row.items():
+                if code != lang and text:
+                    backs.setdefault(code, text)
+    return entries
+
+
+def build_index(rows, path):
+    entries = _entries(rows)
+    records = [
+        key + b"\t" + "\t".join(backs.get(code, "") for code in CODES).encode("utf-8")
+        for key, backs in sorted(entries.items())
+    ]
+    offsets, position = [], 0
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+    offsets.append(position)
+
+    # 書きかけのファイルを読まれないよう、別名で書いてから置き換える
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(",".join(CODES).encode("ascii") + b"\n")
+        f.write(_COUNT.pack(len(records)))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.writelines(records)
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class Dictionary:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"not a LexBot dictionary: {path}")
+        codes_end = self._mm.find(b"\n", len(MAGIC))
+        self.codes = tuple(self._mm[len(MAGIC):codes_end].decode("ascii").split(","))
+        (self._count,) = _COUNT.unpack_from(self._mm, codes_end + 1)
+        self._offsets_at = codes_end + 1 + _COUNT.size
+        self._data_at = self._offsets_at + (self._count + 1) * _COUNT.size
+
+    def __len__(self):
+        return self._count
+
+    def _bounds(self, i):
+        start, end = struct.unpack_from("<2I", self._mm, self._offsets_at + i * _COUNT.size)
+        return self._data_at + start, self._data_at + end
+
+    def _find(self, key):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, end = self._bounds(mid)
+            tab = self._mm.find(b"\t", start, end)
+            current = self._mm[start:tab]
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return self._mm[tab + 1:end].decode("utf-8")
+        return None
+
+    def lookup(self, word, lang=None):
+        # 戻り値: {言語コード: 訳}。lang（学ぶ言語）を渡せばその言語の単語としてだけ探す
+        # （"pan" を英語で引いてスペイン語の「パン」を返したりしない）。lang が無ければ全言語から探す
+        key = normalize_word(word)
+        if not key:
+            return None
+        langs = [lang] if lang else self.codes
+        for code in langs:
+            found = self._find(f"{key}\x1f{code}".encode("utf-8"))
+            if found is not None:
+                return {c: text for c, text in zip(self.codes, found.split("\t")) if text}
+        return None
+
+    def close(self):
+        self._mm.close()
+
+
+def open_dictionary(path, seed=SEED_PATH):
+    # 索引がない・単語リストより古い時だけ作り直す
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(seed):
+        count = build_index(read_seed(seed), path)
+        print(f"📖 Dictionary index built: {count} entries → {path}")
+    return Dictionary(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from storage import data_path
+
+    parser = argparse.ArgumentParser(description="Build or query the LexBot local dictionary index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--seed", default=SEED_PATH)
+    build.add_argument("--out", default=None)
+    lookup = sub.add_parser("lookup")
+    lookup.add_argument("word")
+    lookup.add_argument("--lang", default=None)
+    lookup.add_argument("--index", default=None)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        out = args.out or data_path(DICTIONARY_INDEX)
+        print(build_index(read_seed(args.seed), out), "entries →", out)
+    else:
+        print(open_dictionary(args.index or data_path(DICTIONARY_INDEX)).lookup(args.word, args.lang))
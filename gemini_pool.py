@@ -0,0 +1,47 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+import google.generativeai as genai
+
+# ==== Gemini クライアントプール ====
+# プロセス全体で1つだけ作り、全セッションで共有する。
+# genai.configure はグローバル設定なので、ここで一度だけ呼ぶ。
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+_configure_lock = threading.Lock()
+
+
+class GeminiClientPool:
+    def __init__(self, api_key, model_name=DEFAULT_MODEL, size=4, transport=None, warm_up=True):
+        with _configure_lock:
+            genai.configure(api_key=api_key, transport=transport)
+        self.model_name = model_name
+        self.size = size
+        # LIFO にして直近に使ったモデル（＝接続が温まっているもの）を優先的に貸し出す
+        self._models = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._models.put(genai.GenerativeModel(model_name))
+        if warm_up:
+            threading.Thread(target=self._warm_up, name="gemini-warm-up", daemon=True).start()
+
+    def _warm_up(self):
+        # 最初のセッションが冷えた接続の待ち時間を払わないよう、
+        # 軽いメタデータ取得で下層のトランスポートを開いておく
+        try:
+            genai.get_model(f"models/{self.model_name}")
+        except Exception as e:
+            print("⚠️ Gemini warm-up failed:", e)
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        model = self._models.get(timeout=timeout)
+        try:
+            yield model
+        finally:
+            self._models.put(model)
+
+    def generate_content(self, prompt, **kwargs):
+        with self.borrow() as model:
+            return model.generate_content(prompt, **kwargs)
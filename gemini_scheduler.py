@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from google.api_core import exceptions as api_exceptions
+
+# ==== Gemini 呼び出しスケジューラ ====
+# すべての Gemini 呼び出しをここに通す。
+# - トークンバケットで1分あたりのリクエスト数をクォータ内に収める
+# - 優先度ごとにキューを持ち、対話的な呼び出し（カードをめくる等）を先読みより先に処理する
+# - 同じ優先度の中ではユーザーごとに順番に1件ずつ取り出し、1クラスの集中で他の人が待たされないようにする
+# - 一時的なエラー（クォータ超過など）はジッター付き指数バックオフで再試行する
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.DeadlineExceeded,
+)
+
+
+class GeminiUnavailable(Exception):
+    # 再試行し尽くしても通らなかった（元の例外は __cause__）
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+class GeminiScheduler:
+    def __init__(self, requests_per_minute=15, burst=5, workers=4,
+                 max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # 優先度 -> {ユーザー: deque(_Job)}（OrderedDict の順番がラウンドロビンの順番）
+        self._queues = {INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()}
+        self._pending = 0
+        self._cond = threading.Condition()
+        for n in range(workers):
+            threading.Thread(target=self._worker, name=f"gemini-scheduler-{n}", daemon=True).start()
+
+    def submit(self, fn, *args, user=None, priority=INTERACTIVE, **kwargs):
+        job = _Job(fn, args, kwargs)
+        with self._cond:
+            self._queues[priority].setdefault(user, deque()).append(job)
+            self._pending += 1
+            self._cond.notify()
+        return job.future
+
+    def call(self, fn, *args, user=None, priority=INTERACTIVE, **kwargs):
+        return self.submit(fn, *args, user=user, priority=priority, **kwargs).result()
+
+    def queued(self):
+        with self._cond:
+            return {
+                priority: sum(len(jobs) for jobs in users.values())
+                for priority, users in self._queues.items()
+            }
+
+    def _next_job(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            for priority in (INTERACTIVE, BACKGROUND):
+                users = self._queues[priority]
+                if not users:
+                    continue
+                user, jobs = next(iter(users.items()))
+                job = jobs.popleft()
+                del users[user]
+                if jobs:
+                    # まだ残っていれば列の最後に回す
+                    users[user] = jobs
+                self._pending -= 1
+                return job
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                job.future.set_result(self._run(job))
+            except BaseException as e:
+                job.future.set_exception(e)
+
+    def _run(self, job):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                return job.fn(*job.args, **job.kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise GeminiUnavailable(str(e)) from e
+                # フルジッター: 0〜上限の間でランダムに待つ
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                time.sleep(random.uniform(0, delay))
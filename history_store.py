@@ -0,0 +1,136 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# ==== 学習履歴ストア（SQLite） ====
+# 受験ごとに1行を追記するだけ。スコアや間違えた単語は保存時に計算しておき、
+# 履歴画面はユーザー×日時のインデックスでページ単位に読む。
+
+SUMMARY_COLUMNS = "id, created_at, vocab, score, incorrect_words"
+
+
+def attempt_fingerprint(timestamp, vocab):
+    # 以前の画面側の重複判定（日時 + 並べ替えた語彙）と同じ基準
+    return hashlib.md5((timestamp + ",".join(sorted(vocab))).encode()).hexdigest()
+
+
+def incorrect_vocab(vocab, result):
+    # 採点結果の不正解項目に出てくる語彙を拾う。どの語にも当たらなければ正解の語をそのまま使う
+    words = []
+    for item in result.get("incorrect", []):
+        text = f"{item.get('question', '')} {item.get('correctAnswer', '')}".casefold()
+        hits = [w for w in vocab if w.casefold() in text]
+        if not hits and item.get("correctAnswer"):
+            hits = [str(item["correctAnswer"])]
+        for w in hits:
+            if w not in words:
+                words.append(w)
+    return words
+
+
+def _summary(row):
+    return {
+        "id": row[0],
+        "timestamp": row[1],
+        "vocab": json.loads(row[2]),
+        "score": row[3],
+        "incorrect_words": json.loads(row[4]),
+    }
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS attempts ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id TEXT NOT NULL,"
+                " created_at TEXT NOT NULL,"
+                " fingerprint TEXT NOT NULL,"
+                " vocab TEXT NOT NULL,"
+                " quiz TEXT NOT NULL,"
+                " answers TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " score INTEGER NOT NULL,"
+                " incorrect_words TEXT NOT NULL,"
+                " UNIQUE (user_id, fingerprint))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS attempts_by_user_time"
+                " ON attempts (user_id, created_at DESC, id DESC)"
+            )
+            self._db.commit()
+
+    def append(self, user_id, timestamp, vocab, quiz, answers, result):
+        vocab = list(vocab)
+        row = (
+            user_id,
+            timestamp,
+            attempt_fingerprint(timestamp, vocab),
+            json.dumps(vocab, ensure_ascii=False),
+            json.dumps(quiz, ensure_ascii=False),
+            json.dumps(answers, ensure_ascii=False),
+            json.dumps(result, ensure_ascii=False),
+            int(result.get("scorePercentage", 0)),
+            json.dumps(incorrect_vocab(vocab, result), ensure_ascii=False),
+        )
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO attempts (user_id, created_at, fingerprint, vocab, quiz,"
+                " answers, result, score, incorrect_words) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._db.commit()
+            return cur.lastrowid if cur.rowcount else None
+
+    def count(self, user_id):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM attempts WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+    def page(self, user_id, limit=20, offset=0):
+        # 新しい順。一覧に要るのは要約だけなので、問題と回答の本体は読まない
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM attempts WHERE user_id = ?"
+                " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (user_id, limit, offset),
+            ).fetchall()
+        return [_summary(row) for row in rows]
+
+    def get(self, user_id, attempt_id):
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {SUMMARY_COLUMNS}, quiz, answers, result FROM attempts"
+                " WHERE user_id = ? AND id = ?",
+                (user_id, attempt_id),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = _summary(row)
+        entry["quiz"] = json.loads(row[5])
+        entry["answers"] = json.loads(row[6])
+        entry["result"] = json.loads(row[7])
+        return entry
+
+    def expire_users(self, prefix, max_age_seconds):
+        # prefix で始まるユーザー（ゲストなど）の古い受験を消す。
+        # created_at は "%Y-%m-%d %H:%M:%S" なので文字列のまま比べられる
+        cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM attempts WHERE user_id LIKE ? || '%' AND created_at < ?", (prefix, cutoff)
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def clear(self, user_id):
+        with self._lock:
+            self._db.execute("DELETE FROM attempts WHERE user_id = ?", (user_id,))
+            self._db.commit()
@@ -0,0 +1,62 @@
+import json
+import os
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+
+# ==== 多言語対応用 ====
+# UI 文言は locales/<言語コード>.json に言語ごとに置き、
+# その言語が初めて選ばれた時に1回だけ読み込む（プロセス内で共有・変更不可）。
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+
+LANGUAGES = ["English", "日本語", "中文", "한국어", "Español"]
+LANG_CODES = MappingProxyType({
+    "English": "en",
+    "日本語": "ja",
+    "中文": "zh",
+    "한국어": "ko",
+    "Español": "es",
+})
+CODE_TO_LANG_LABELS = MappingProxyType({code: label for label, code in LANG_CODES.items()})
+
+# ラベル
+direction_label = MappingProxyType({"en-to-ja": "英語から日本語", "ja-to-en": "日本語から英語"})
+
+
+def _load_json(name):
+    with open(os.path.join(LOCALES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_catalog(lang_label):
+    return MappingProxyType(_load_json(f"{LANG_CODES[lang_label]}.json"))
+
+
+class _LazyCatalogs(Mapping):
+    # ui_text[言語ラベル] で今までどおり引ける。読み込みは初回アクセス時
+    def __getitem__(self, lang_label):
+        if lang_label not in LANG_CODES:
+            raise KeyError(lang_label)
+        return load_catalog(lang_label)
+
+    def __contains__(self, lang_label):
+        return lang_label in LANG_CODES
+
+    def __iter__(self):
+        return iter(LANGUAGES)
+
+    def __len__(self):
+        return len(LANGUAGES)
+
+
+ui_text = _LazyCatalogs()
+
+
+# ==== クイズの出力例 ====
+# 形式 → 文脈 → 言語（ペア）ごとの例
+@lru_cache(maxsize=1)
+def quiz_examples():
+    return _load_json("quiz_examples.json")
+
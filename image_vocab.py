@@ -0,0 +1,147 @@
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+from vocab_index import split_words
+
+try:
+    import pytesseract
+except ImportError:  # OCR は任意。なければ Gemini だけで読む
+    pytesseract = None
+
+# ==== 画像から単語を取り出す ====
+# アップロード・撮影した画像を Pillow で縮小・正規化してから読む。
+# 先にローカルの OCR（tesseract）を使い、使えない・何も取れない時だけ Gemini に画像を渡す。
+# 結果は画像の中身のハッシュごとに保存し、同じ画像なら2回目からは読まない。
+
+MAX_SIDE = 2400         # OCR に渡す画像の長辺（これより大きければ縮小する）
+VISION_MAX_SIDE = 1024  # Gemini に渡す画像の長辺
+TILE_SIZE = 1200        # 大きい画像はこの大きさのタイルに分けて OCR する
+TILE_OVERLAP = 80       # タイルの境目で単語が切れないよう重ねる幅
+
+# 学ぶ言語のコード → tesseract の言語名
+OCR_LANGS = {
+    "en": "eng",
+    "ja": "jpn",
+    "zh": "chi_sim",
+    "ko": "kor",
+    "es": "spa",
+}
+
+
+def image_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def prepare_image(data, max_side=MAX_SIDE):
+    # 回転（EXIF）を直し、グレースケール・コントラスト補正をして max_side 以内に縮める
+    image = Image.open(io.BytesIO(data))
+    # JPEG は読み込み時点で小さくデコードして、巨大な写真でもメモリを使いすぎない
+    image.draft("L", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    return ImageOps.autocontrast(image)
+
+
+def _tile_starts(length, tile_size, overlap):
+    # 最後のタイルは端に揃え、細切れのタイルを作らない
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, tile_size - overlap))
+    return starts + [length - tile_size]
+
+
+def iter_tiles(image, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    width, height = image.size
+    for top in _tile_starts(height, tile_size, overlap):
+        for left in _tile_starts(width, tile_size, overlap):
+            yield image.crop((left, top, min(left + tile_size, width), min(top + tile_size, height)))
+
+
+def ocr_available():
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+def ocr_words(image, lang_code):
+    lang = OCR_LANGS.get(lang_code, "eng")
+    words = {}
+    for tile in iter_tiles(image):
+        for word in split_words(pytesseract.image_to_string(tile, lang=lang)):
+            words.setdefault(word, None)
+    return list(words)
+
+
+class ImageWordCache:
+    # 画像のハッシュ × 言語 → 単語リスト（SQLite・全セッション共有）
+    def __init__(self, path, max_age_seconds=90 * 24 * 3600):
+        self.max_age_seconds = max_age_seconds
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS image_words ("
+                " digest TEXT NOT NULL, lang TEXT NOT NULL, created_at REAL NOT NULL, words TEXT NOT NULL,"
+                " PRIMARY KEY (digest, lang))"
+            )
+            self._db.execute(
+                "DELETE FROM image_words WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+            )
+            self._db.commit()
+
+    def get(self, digest, lang_code):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT words FROM image_words WHERE digest = ? AND lang = ?", (digest, lang_code)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, digest, lang_code, words):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO image_words (digest, lang, created_at, words) VALUES (?, ?, ?, ?)",
+                (digest, lang_code, time.time(), json.dumps(words, ensure_ascii=False)),
+            )
+            self._db.commit()
+
+
+class ImageVocabExtractor:
+    def __init__(self, cache):
+        self.cache = cache
+        self.use_ocr = ocr_available()
+
+    def extract(self, data, lang_code, vision=None):
+        # vision(image, lang_code) -> 単語リスト は OCR で取れなかった・失敗した時だけ呼ぶ（Gemini など）。
+        # 戻り値: (単語リスト, どこから取ったか "cache" / "ocr" / "vision" / None)
+        digest = image_digest(data)
+        cached = self.cache.get(digest, lang_code)
+        if cached is not None:
+            return cached, "cache"
+
+        image = prepare_image(data)
+        words, source = [], None
+        if self.use_ocr:
+            try:
+                words, source = ocr_words(image, lang_code), "ocr"
+            except (RuntimeError, OSError):
+                # その言語の学習データ（jpn など）が入っていない時の TesseractError（RuntimeError）や
+                # タイムアウト。OCR では読めなかったものとして Gemini に回す
+                words, source = [], None
+        if not words and vision is not None:
+            image.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE), Image.LANCZOS)
+            words, source = vision(image, lang_code), "vision"
+        if words:
+            self.cache.put(digest, lang_code, words)
+        return words, source if words else None
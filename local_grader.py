@@ -0,0 +1,72 @@
+import re
+import unicodedata
+
+# ==== ローカル採点 ====
+# 選択式と、正規化して完全一致する記述式はその場で採点する。
+# 記述式で一致しなかったもの（言い換え・表記ゆれの可能性あり）だけを Gemini に回す。
+
+_PARENS = re.compile(r"[(（][^)）]*[)）]")
+_EDGE_PUNCTUATION = " \t\n\"'`“”‘’「」『』.,!?。、！？:;"
+
+
+def normalize_answer(text):
+    text = unicodedata.normalize("NFKC", str(text or ""))
+    text = " ".join(text.split()).casefold()
+    return text.strip(_EDGE_PUNCTUATION)
+
+
+def answer_variants(correct):
+    # "川／かわ" のように ／ で区切られた別解も正解として扱う（NFKC で ／ は / になる）。
+    # "and/or" "1/2" のように / を含む答えもあるので、区切る前の全体も残す
+    text = unicodedata.normalize("NFKC", str(correct or ""))
+    variants = set()
+    for part in [text] + text.split("/"):
+        for candidate in (part, _PARENS.sub("", part)):
+            candidate = normalize_answer(candidate)
+            if candidate:
+                variants.add(candidate)
+    return variants
+
+
+def is_exact_match(answer, correct):
+    answer = normalize_answer(answer)
+    return bool(answer) and answer in answer_variants(correct)
+
+
+def incorrect_entry(q, answer):
+    return {
+        "question": q.get("question", ""),
+        "yourAnswer": answer,
+        "yourAnswerMeaning": "",
+        "correctAnswer": str(q.get("correctAnswer", "")),
+        "correctMeaning": "",
+        "feedback": "",
+    }
+
+
+def grade_locally(quiz, answers, format):
+    # 戻り値: (正解数, ローカルで不正解と決まった項目, Gemini に確認が必要な問題番号)
+    correct = 0
+    incorrect = []
+    needs_model = []
+    for i, q in enumerate(quiz):
+        answer = answers[i].get("answer", "") if i < len(answers) else ""
+        answer = "" if answer is None else str(answer)
+        if format == "multiple-choice":
+            # 選んだ選択肢と正解の文字列全体を比べる（選択肢の中の / で区切らない）
+            chosen = normalize_answer(answer)
+            is_correct = bool(chosen) and chosen == normalize_answer(q.get("correctAnswer"))
+        else:
+            is_correct = is_exact_match(answer, q.get("correctAnswer"))
+        if is_correct:
+            correct += 1
+        elif format == "multiple-choice" or not normalize_answer(answer):
+            # 選択肢の不一致・未回答は判断の余地がないのでローカルで不正解にする
+            incorrect.append((i, incorrect_entry(q, answer)))
+        else:
+            needs_model.append(i)
+    return correct, incorrect, needs_model
+
+
+def score_percentage(correct, total):
+    return int(round(correct * 100 / total)) if total else 0
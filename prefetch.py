@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from translation_cache import normalize_key
+
+# ==== 先読み翻訳ワーカー ====
+# 表示中のカードの次の N 枚を裏で訳して、共有の翻訳キャッシュに入れておく。
+# 同じ単語×言語がすでに先読み中なら、二重に頼まない。
+
+
+class TranslationPrefetcher:
+    def __init__(self, translate_batch, cache, max_workers=4):
+        # translate_batch({word: {code, ...}}, session_id, priority) -> {word: {code: translation}}
+        self._translate_batch = translate_batch
+        self._cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._inflight = {}  # normalize_key(word, code) -> Future
+        self._by_session = {}  # session_id -> set(Future)
+
+    def prefetch(self, session_id, pending, priority):
+        # priority はそのまま translate_batch に渡す（すぐ出すカードは対話的な呼び出しと同じ優先度で頼む）
+        todo = {}
+        with self._lock:
+            for word, codes in pending.items():
+                for code in codes:
+                    key = normalize_key(word, code)
+                    if key in self._inflight:
+                        continue
+                    todo.setdefault(word, set()).add(code)
+            if not todo:
+                return None
+
+            future = self._executor.submit(self._run, session_id, todo, priority)
+            for word, codes in todo.items():
+                for code in codes:
+                    self._inflight[normalize_key(word, code)] = future
+            self._by_session.setdefault(session_id, set()).add(future)
+
+        future.add_done_callback(lambda f: self._forget(session_id, todo, f))
+        return future
+
+    def _run(self, session_id, todo, priority):
+        # キャッシュに入ったものは外してから頼む
+        remaining = {}
+        for word, codes in todo.items():
+            missing = {code for code in codes if self._cache.get(word, code) is None}
+            if missing:
+                remaining[word] = missing
+        if not remaining:
+            return {}
+
+        translations = self._translate_batch(remaining, session_id, priority)
+        for word, by_lang in translations.items():
+            for code, value in by_lang.items():
+                self._cache.put(word, code, value)
+        return translations
+
+    def _forget(self, session_id, todo, future):
+        with self._lock:
+            for word, codes in todo.items():
+                for code in codes:
+                    key = normalize_key(word, code)
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+            futures = self._by_session.get(session_id)
+            if futures is not None:
+                futures.discard(future)
+                if not futures:
+                    del self._by_session[session_id]
+
+    def wait(self, word, code, timeout=None):
+        # 先読み中なら終わるまで待ち、キャッシュから返す（先読みしていなければ None）
+        with self._lock:
+            future = self._inflight.get(normalize_key(word, code))
+        if future is not None:
+            wait([future], timeout=timeout)
+        return self._cache.get(word, code)
+
+    def cancel_session(self, session_id):
+        # まだ始まっていない先読みだけ取り消す
+        with self._lock:
+            futures = list(self._by_session.get(session_id, ()))
+        for future in futures:
+            future.cancel()
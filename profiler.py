@@ -0,0 +1,208 @@
+import functools
+import hmac
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from session_model import state_sizes
+
+# ==== 再実行プロファイラ（任意で有効化） ====
+# サーバー側で環境変数 LEXBOT_PROFILE=1 を設定した時だけ計測する（URL からは有効にできない）。
+# 結果の画面（?admin=profiler）は LEXBOT_ADMIN_TOKEN を設定し、?token= で同じ値を渡した時だけ開ける。
+# 1回の再実行ごとに、画面（stage）別・区間別・関数別の時間、ウィジェット数、
+# session_state の大きさを記録し、プロセス内に直近の分だけ保持する。
+
+PROFILE_ENV = "LEXBOT_PROFILE"
+
+WIDGET_FUNCTIONS = (
+    "button", "download_button", "checkbox", "toggle", "radio", "selectbox", "multiselect",
+    "slider", "select_slider", "text_input", "text_area", "number_input", "date_input",
+    "time_input", "file_uploader", "camera_input", "color_picker", "audio_input",
+)
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def session_state_bytes(state):
+    return sum(state_sizes(state).values())
+
+
+class RerunProfile:
+    __slots__ = ("stage", "started", "section", "section_started", "sections",
+                 "functions", "widgets", "state")
+
+    def __init__(self, stage, state):
+        self.stage = stage
+        self.state = state
+        self.started = time.perf_counter()
+        self.section = "setup"
+        self.section_started = self.started
+        self.sections = defaultdict(float)
+        self.functions = defaultdict(lambda: [0.0, 0])
+        self.widgets = 0
+
+    def begin_section(self, name):
+        now = time.perf_counter()
+        self.sections[self.section] += now - self.section_started
+        self.section = name
+        self.section_started = now
+
+    def finish(self):
+        self.begin_section(None)
+        return {
+            "stage": self.stage,
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "sections": {k: v * 1000 for k, v in self.sections.items() if k is not None},
+            "functions": {k: (v[0] * 1000, v[1]) for k, v in self.functions.items()},
+            "widgets": self.widgets,
+            "state_bytes": session_state_bytes(self.state),
+        }
+
+
+class ProfileStore:
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._reruns = deque(maxlen=window)
+
+    def add(self, record):
+        with self._lock:
+            self._reruns.append(record)
+
+    def summary(self):
+        with self._lock:
+            reruns = list(self._reruns)
+
+        by_stage = defaultdict(list)
+        for r in reruns:
+            by_stage[r["stage"]].append(r)
+        stages = [
+            {
+                "stage": stage,
+                "reruns": len(rs),
+                "p50_ms": round(_percentile([r["total_ms"] for r in rs], 50), 1),
+                "p95_ms": round(_percentile([r["total_ms"] for r in rs], 95), 1),
+                "widgets_max": max(r["widgets"] for r in rs),
+                "state_kb_max": round(max(r["state_bytes"] for r in rs) / 1024, 1),
+            }
+            for stage, rs in sorted(by_stage.items())
+        ]
+
+        sections = defaultdict(list)
+        functions = defaultdict(lambda: [[], 0])
+        for r in reruns:
+            for name, ms in r["sections"].items():
+                sections[name].append(ms)
+            for name, (ms, calls) in r["functions"].items():
+                functions[name][0].append(ms)
+                functions[name][1] += calls
+        section_rows = [
+            {"section": name, "p50_ms": round(_percentile(v, 50), 1), "p95_ms": round(_percentile(v, 95), 1)}
+            for name, v in sorted(sections.items())
+        ]
+        function_rows = sorted(
+            (
+                {"function": name, "calls": calls, "total_ms": round(sum(v), 1),
+                 "p95_ms": round(_percentile(v, 95), 1)}
+                for name, (v, calls) in functions.items()
+            ),
+            key=lambda row: row["total_ms"], reverse=True,
+        )
+        return stages, section_rows, function_rows
+
+
+def _current():
+    return getattr(_local, "profile", None)
+
+
+def _install(st):
+    # ウィジェット数を数えるため、また st.rerun / st.stop で抜ける前に記録を閉じるため、
+    # streamlit の関数を一度だけ包む。計測中でないスレッドでは何もしない
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        for name in WIDGET_FUNCTIONS:
+            original = getattr(st, name, None)
+            if original is None:
+                continue
+
+            def counted(*args, __original=original, **kwargs):
+                profile = _current()
+                if profile is not None:
+                    profile.widgets += 1
+                return __original(*args, **kwargs)
+
+            functools.update_wrapper(counted, original)
+            setattr(st, name, counted)
+
+        for name in ("rerun", "stop"):
+            original = getattr(st, name)
+
+            def finishing(*args, __original=original, **kwargs):
+                finish_rerun()
+                return __original(*args, **kwargs)
+
+            functools.update_wrapper(finishing, original)
+            setattr(st, name, finishing)
+        _installed = True
+
+
+def profiling_enabled():
+    return os.environ.get(PROFILE_ENV) == "1"
+
+
+def admin_authorized(query_params, admin_token):
+    # トークンが設定されていなければ管理画面は開けない
+    if not admin_token or query_params.get("admin") != "profiler":
+        return False
+    return hmac.compare_digest(str(query_params.get("token", "")), str(admin_token))
+
+
+def start_rerun(st, store, stage):
+    _install(st)
+    _local.store = store
+    _local.profile = RerunProfile(stage, st.session_state)
+
+
+def mark_section(name):
+    profile = _current()
+    if profile is not None:
+        profile.begin_section(name)
+
+
+def finish_rerun():
+    profile = _current()
+    if profile is None:
+        return
+    _local.profile = None
+    _local.store.add(profile.finish())
+
+
+def profiled(fn):
+    # 画面モジュールはどれも render() なので、モジュール名を付けて区別する
+    name = fn.__qualname__ if fn.__module__ == "__main__" else f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current()
+        if profile is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            entry = profile.functions[name]
+            entry[0] += time.perf_counter() - started
+            entry[1] += 1
+
+    return wrapper
@@ -0,0 +1,76 @@
+import json
+import unicodedata
+from functools import lru_cache
+
+from i18n import CODE_TO_LANG_LABELS, quiz_examples
+
+# ==== クイズ用プロンプトの組み立て ====
+# 変わらない部分（出力例の JSON・指示文）は (形式, 文脈, 言語) ごとに1回だけ作ってキャッシュし、
+# 呼び出しごとに変わるのは単語リストと問題数だけにする。
+
+
+def example_key(context, from_code, to_code):
+    # 穴埋めは学ぶ言語1つ、翻訳は「元-先」のペアで例が登録されている
+    if context == "fill-blank":
+        return from_code
+    return f"{from_code}-{to_code}"
+
+
+@lru_cache(maxsize=None)
+def example_block(format, context, key):
+    examples = quiz_examples().get(format, {}).get(context, {}).get(key)
+    if not examples and format == "free-text":
+        # 記述式の例がなければ、選択式の例から選択肢を外して使う
+        examples = [
+            {k: v for k, v in item.items() if k != "options"}
+            for item in quiz_examples().get("multiple-choice", {}).get(context, {}).get(key, [])
+        ]
+    return json.dumps(examples or [], ensure_ascii=False, separators=(",", ":"))
+
+
+@lru_cache(maxsize=None)
+def instruction_block(format, context, from_code, to_code):
+    # {count} だけは呼び出し時に埋める
+    from_lang_label = CODE_TO_LANG_LABELS.get(from_code, from_code)
+    to_lang_label = CODE_TO_LANG_LABELS.get(to_code, to_code)
+    return f"""
+Using the following words, create {{count}} {context} questions in the {format} format.
+Language pair: {from_lang_label} → {to_lang_label}
+Use real words in the options (not a, b, c). Ensure natural context and appropriate difficulty.
+Make sure each quiz item includes both "question" and "correctAnswer" keys.
+Randomize the order of the words when generating questions.
+For multiple-choice questions, randomize the order of the answer options.
+Create the questions in a way that helps the learner understand and remember the meaning and usage of each word.
+Return the output as a pure JSON array starting with [] (no explanations or markdown)
+"""
+
+
+def estimate_tokens(text):
+    # 目安: CJK は1文字≒1トークン、それ以外は4文字≒1トークン
+    wide = sum(1 for ch in text if unicodedata.east_asian_width(ch) in ("W", "F"))
+    return wide + (len(text) - wide + 3) // 4
+
+
+@lru_cache(maxsize=None)
+def _fixed_tokens(format, context, from_code, to_code):
+    key = example_key(context, from_code, to_code)
+    return (
+        estimate_tokens(instruction_block(format, context, from_code, to_code))
+        + estimate_tokens(example_block(format, context, key))
+    )
+
+
+def build_quiz_prompt(words, format, context, count, direction):
+    # 戻り値: (プロンプト, 推定トークン数)
+    from_code, to_code = direction.split("-to-")
+    word_list = ", ".join(words)
+    instruction = instruction_block(format, context, from_code, to_code).replace("{count}", str(count))
+    prompt = f"""
+単語リスト: {word_list}
+問題数: {count}
+{instruction}
+出力形式（JSONリスト）例:
+{example_block(format, context, example_key(context, from_code, to_code))}
+"""
+    tokens = _fixed_tokens(format, context, from_code, to_code) + estimate_tokens(word_list) + 16
+    return prompt, tokens
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+# ==== クイズキャッシュ（語彙セット × 設定ごと） ====
+# 同じ語彙・形式・文脈・翻訳方向・問題数のクイズを最大 K 種類まで保存し、順番に出す。
+# 古くなったものは捨てる。足りないぶんは裏で1種類ずつ作り足す。
+
+QUIZ_VARIANTS_PER_KEY = 3
+QUIZ_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+def quiz_cache_key(words, format, context, direction, count):
+    vocab = sorted({" ".join(unicodedata.normalize("NFKC", w).split()).casefold() for w in words})
+    payload = json.dumps([vocab, format, context, direction, int(count)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuizCache:
+    def __init__(self, path, variants_per_key=QUIZ_VARIANTS_PER_KEY, max_age_seconds=QUIZ_MAX_AGE_SECONDS):
+        self.variants_per_key = variants_per_key
+        self.max_age_seconds = max_age_seconds
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # 作り足しは1本ずつ。クイズ生成側のワーカーとは別のスレッドで動かす
+        self._refill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quiz-refill")
+        self._refilling = set()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_variants ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " key TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " quiz TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS quiz_variants_by_key ON quiz_variants (key, id)")
+            self._db.commit()
+
+    def _expire(self):
+        self._db.execute(
+            "DELETE FROM quiz_variants WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+        )
+
+    def count(self, key):
+        with self._lock:
+            self._expire()
+            return self._db.execute(
+                "SELECT COUNT(*) FROM quiz_variants WHERE key = ?", (key,)
+            ).fetchone()[0]
+
+    def add(self, key, quiz):
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO quiz_variants (key, created_at, quiz) VALUES (?, ?, ?)",
+                (key, time.time(), json.dumps(quiz, ensure_ascii=False)),
+            )
+            # 新しい K 件だけ残す
+            self._db.execute(
+                "DELETE FROM quiz_variants WHERE key = ? AND id NOT IN"
+                " (SELECT id FROM quiz_variants WHERE key = ? ORDER BY id DESC LIMIT ?)",
+                (key, key, self.variants_per_key),
+            )
+            self._db.commit()
+            return cur.lastrowid
+
+    def next_variant(self, key, last_id=None):
+        # last_id の次の種類を返す（最後まで行ったら先頭に戻る）。なければ None
+        with self._lock:
+            self._expire()
+            rows = self._db.execute(
+                "SELECT id, quiz FROM quiz_variants WHERE key = ? ORDER BY id", (key,)
+            ).fetchall()
+        if not rows:
+            return None
+        row = next((r for r in rows if last_id is not None and r[0] > last_id), rows[0])
+        return row[0], json.loads(row[1])
+
+    def refill(self, key, generate):
+        # generate() -> クイズ（list）。同じキーの作り足しは同時に1本だけ
+        with self._lock:
+            if key in self._refilling:
+                return None
+            self._refilling.add(key)
+
+        def run():
+            try:
+                if self.count(key) >= self.variants_per_key:
+                    return
+                quiz = generate()
+                if quiz:
+                    self.add(key, quiz)
+            except Exception as e:
+                print("❌ Quiz cache refill failed:", e)
+            finally:
+                with self._lock:
+                    self._refilling.discard(key)
+
+        return self._refill_executor.submit(run)
@@ -0,0 +1,110 @@
+import random
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from response_decoding import QUIZ_ITEM_SCHEMA, decode_items, schema_problems
+
+# ==== 大きな単語リストのクイズ生成（分割・並列） ====
+# 単語リストを一定サイズに分け、チャンクごとに並列で生成してから1つにまとめる。
+# 失敗したチャンクだけを生成し直す。
+
+QUIZ_CHUNK_SIZE = 15
+QUIZ_MAX_WORKERS = 4
+
+# プロセス全体で共有（同時に Gemini へ投げる数の上限にもなる）
+_executor = ThreadPoolExecutor(max_workers=QUIZ_MAX_WORKERS, thread_name_prefix="quiz")
+
+
+def validate_quiz_item(item, format, fallback_question="word"):
+    # 使える形なら（必要なら補って）返し、使えなければ None
+    if not isinstance(item, dict):
+        return None
+    if "question" not in item and "correctAnswer" in item:
+        item["question"] = fallback_question
+    if schema_problems(item, QUIZ_ITEM_SCHEMA):
+        return None
+    if format == "multiple-choice" and not isinstance(item.get("options"), list):
+        return None
+    return item
+
+
+def decode_quiz_items(text, format, fallback_question):
+    # fallback_question(index) は question が欠けた問題に入れる文
+    def fix_item(item, i):
+        return validate_quiz_item(item, format, fallback_question(i))
+    return decode_items(text, QUIZ_ITEM_SCHEMA, fix_item)
+
+
+def is_complete_quiz(quiz, count, failed=(), salvaged=()):
+    # 共有キャッシュに入れてよいか: 失敗したチャンクも壊れた応答の修復もなく、count 問そろっている
+    return not failed and not salvaged and len(quiz) == count
+
+
+def split_quiz_chunks(words, count, chunk_size=QUIZ_CHUNK_SIZE):
+    # 単語を混ぜてから分け、問題数は最大剰余法で割り振る（合計がちょうど count になる）。
+    # 端数の1問がどのチャンクに行くかも毎回変わるので、少ない問題数でもリスト全体から出る
+    words = random.sample(list(words), len(words))
+    chunks = [words[i:i + chunk_size] for i in range(0, len(words), chunk_size)]
+    total = len(words)
+    if not total or count <= 0:
+        return []
+    count = min(count, total)
+    counts = [count * len(chunk) // total for chunk in chunks]
+    remainders = [count * len(chunk) % total for chunk in chunks]
+    order = random.sample(range(len(chunks)), len(chunks))
+    order.sort(key=lambda n: remainders[n], reverse=True)
+    for n in order[:count - sum(counts)]:
+        counts[n] += 1
+    return [(chunk, chunk_count) for chunk, chunk_count in zip(chunks, counts) if chunk_count]
+
+
+def _question_key(item):
+    question = " ".join(str(item.get("question", "")).split()).casefold()
+    answer = " ".join(str(item.get("correctAnswer", "")).split()).casefold()
+    return question, answer
+
+
+def generate_quiz_parallel(generate_chunk, words, count, chunk_size=QUIZ_CHUNK_SIZE,
+                           max_attempts=2, on_chunk=None):
+    # generate_chunk(chunk_words, chunk_count) -> 検証済みの問題リスト（失敗時は例外か空リスト）
+    # on_chunk(items) は呼び出し元のスレッドで、チャンクが届くたびに呼ばれる
+    plan = split_quiz_chunks(words, count, chunk_size)
+    attempts = {}
+    running = {}
+    for n, (chunk, chunk_count) in enumerate(plan):
+        attempts[n] = 1
+        running[_executor.submit(generate_chunk, chunk, chunk_count)] = n
+
+    quiz = []
+    seen = set()
+    failed = []
+    while running:
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in done:
+            n = running.pop(future)
+            try:
+                items = future.result() or []
+            except Exception as e:
+                print(f"❌ Quiz chunk {n + 1} failed:", e)
+                items = []
+
+            if not items:
+                if attempts[n] < max_attempts:
+                    attempts[n] += 1
+                    chunk, chunk_count = plan[n]
+                    running[_executor.submit(generate_chunk, chunk, chunk_count)] = n
+                else:
+                    failed.append(n)
+                continue
+
+            fresh = []
+            for item in items:
+                key = _question_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    fresh.append(item)
+            quiz.extend(fresh)
+            if on_chunk is not None:
+                on_chunk(fresh)
+
+    random.shuffle(quiz)
+    return quiz[:count], failed
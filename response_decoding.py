@@ -0,0 +1,284 @@
+import json
+
+# ==== Gemini 応答のデコード ====
+
+
+class JSONArrayStreamDecoder:
+    # ストリーミングで届く "[{...}, {...}, ...]" を少しずつ受け取り、
+    # 閉じ括弧まで届いた要素から順に返す。文字列中の括弧やエスケープも考慮する。
+    # 前置きの "[3]" のようにオブジェクトを1つも含まない配列は読み飛ばし、次の [ を待つ。
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self._has_object = False
+        self.done = False
+
+    def feed(self, text):
+        if self.done:
+            return []
+        self._buffer += text or ""
+        items = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._started:
+                # 配列が始まるまでの前置き（```json など）は読み飛ばす
+                if ch == "[":
+                    self._started = True
+                    self._depth = 1
+                    self._has_object = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 1:
+                    self._item_start = i
+                    self._has_object = self._has_object or ch == "{"
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._item_start is not None:
+                    try:
+                        items.append(json.loads(buffer[self._item_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                elif self._depth == 0 and not self._has_object:
+                    # オブジェクトのない配列（説明文中の "[3]" など）。本物の配列をまた探す
+                    self._started = False
+                elif self._depth == 0:
+                    # 配列の終わり。以降は無視する
+                    self.done = True
+                    self._buffer = ""
+                    return items
+            i += 1
+
+        # 使い終わった部分は捨てて、バッファが伸び続けないようにする
+        keep_from = self._item_start if self._item_start is not None else i
+        self._buffer = buffer[keep_from:]
+        if self._item_start is not None:
+            self._item_start = 0
+        self._pos = i - keep_from
+        return items
+
+
+# ==== 応答全体のデコード（抽出・修復・検証） ====
+# 前後に説明文や ``` が付いていても JSON 値を見つけ出し（読めない・形が違えば次の括弧から探し直す）、
+# 末尾カンマや途中で切れた配列を直してから読み込む。何を直したかは repairs に残す。
+
+# スキーマ: {キー: (許す型, 必須かどうか)}
+QUIZ_ITEM_SCHEMA = {
+    "question": (str, True),
+    "correctAnswer": ((str, int, float), True),
+    "options": (list, False),
+    "hint": (str, False),
+}
+
+# 記述式のうちローカルで判定できなかった問題だけを Gemini に確認してもらう時の形
+REVIEW_RESULT_SCHEMA = {
+    "results": (list, True),
+    "overallFeedback": (str, False),
+}
+
+REVIEW_ITEM_SCHEMA = {
+    "index": (int, True),
+    "correct": (bool, True),
+    "yourAnswerMeaning": (str, False),
+    "correctMeaning": (str, False),
+    "feedback": (str, False),
+}
+
+
+class DecodeResult:
+    def __init__(self, value=None, repairs=None, dropped=None):
+        self.value = value
+        self.repairs = repairs or []   # 直した内容（"trailing comma" など）
+        self.dropped = dropped or []   # スキーマに合わず捨てた要素の番号
+
+    @property
+    def ok(self):
+        return self.value is not None
+
+    @property
+    def salvaged(self):
+        return bool(self.repairs or self.dropped)
+
+
+def _scan_first_value(text, begin=0):
+    # begin 以降で最初の JSON 値を探す
+    # 戻り値: (開始位置, 終了位置, 閉じていない括弧, 最上位の要素が最後に完結した位置)
+    start = None
+    stack = []
+    in_string = False
+    escape = False
+    boundary = None
+    for i in range(begin, len(text)):
+        ch = text[i]
+        if start is None:
+            if ch in "[{":
+                start = i
+                stack.append(ch)
+            continue
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "[{":
+            stack.append(ch)
+        elif ch in "]}":
+            stack.pop()
+            if not stack:
+                return start, i + 1, stack, boundary
+            if len(stack) == 1:
+                boundary = i + 1
+        elif ch == "," and len(stack) == 1:
+            boundary = i
+    return start, len(text), stack, boundary
+
+
+def _strip_trailing_commas(fragment):
+    out = []
+    in_string = False
+    escape = False
+    removed = False
+    for i, ch in enumerate(fragment):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = fragment[i + 1:].lstrip()
+            if rest[:1] in ("]", "}"):
+                removed = True
+                continue
+        out.append(ch)
+    return "".join(out), removed
+
+
+def _decode_at(text, begin):
+    # 戻り値: (DecodeResult, 次に探し始める位置 or None)
+    repairs = []
+    start, end, stack, boundary = _scan_first_value(text, begin)
+    if start is None:
+        return DecodeResult(), None
+
+    fragment = text[start:end]
+    if stack:
+        # 途中で切れている: 最後に完結した要素まで戻して、外側の括弧だけ閉じる
+        if boundary is None:
+            return DecodeResult(repairs=["truncated"]), start + 1
+        fragment = text[start:boundary] + ("]" if stack[0] == "[" else "}")
+        repairs.append("truncated")
+
+    fragment, removed = _strip_trailing_commas(fragment)
+    if removed:
+        repairs.append("trailing comma")
+
+    try:
+        return DecodeResult(json.loads(fragment), repairs), end
+    except json.JSONDecodeError:
+        # 読めなければ、次の括弧から探し直す
+        return DecodeResult(repairs=repairs), start + 1
+
+
+def extract_json(text, accept=None):
+    # 前置きの "[3]" のように読めても使えない値なら（accept(value) が偽なら）その後ろを探し続ける
+    text = text or ""
+    first = None
+    begin = 0
+    while begin is not None:
+        result, begin = _decode_at(text, begin)
+        if first is None:
+            first = result
+        if result.ok and (accept is None or accept(result.value)):
+            return result
+    return DecodeResult(repairs=first.repairs)
+
+
+def schema_problems(value, schema):
+    if not isinstance(value, dict):
+        return ["not an object"]
+    problems = []
+    for key, (types, required) in schema.items():
+        if key not in value:
+            if required:
+                problems.append(f"missing {key}")
+        elif not isinstance(value[key], types):
+            problems.append(f"bad {key}")
+    return problems
+
+
+def _unwrap_object(value):
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict):
+        return value[0]
+    return value
+
+
+def decode_object(text, schema):
+    result = extract_json(text, lambda value: not schema_problems(_unwrap_object(value), schema))
+    if not result.ok:
+        return result
+    if result.value is not _unwrap_object(result.value):
+        result.value = _unwrap_object(result.value)
+        result.repairs.append("unwrapped array")
+    return result
+
+
+def _unwrap_items(value):
+    # {"quiz": [...]} のように包まれて返ってきた場合は中の配列を使う
+    if isinstance(value, dict):
+        lists = [v for v in value.values() if isinstance(v, list)]
+        if len(lists) == 1:
+            return lists[0]
+    return value
+
+
+def _has_object_items(value):
+    items = _unwrap_items(value)
+    return isinstance(items, list) and any(isinstance(item, dict) for item in items)
+
+
+def decode_items(text, item_schema, fix_item=None):
+    # JSON 配列を読み、各要素をスキーマで検証する。合わない要素だけ捨てる
+    # fix_item(item, index) で検証前に足りないキーを補える
+    # 前置きの "[3]" のような、オブジェクトを1つも含まない配列は読み飛ばす
+    result = extract_json(text, _has_object_items)
+    items = _unwrap_items(result.value)
+    if not isinstance(items, list):
+        return DecodeResult(repairs=result.repairs)
+    if items is not result.value:
+        result.repairs.append("unwrapped object")
+
+    kept = []
+    for i, item in enumerate(items):
+        if fix_item is not None and isinstance(item, dict):
+            item = fix_item(item, i)
+        if schema_problems(item, item_schema):
+            result.dropped.append(i)
+        else:
+            kept.append(item)
+    result.value = kept
+    return result
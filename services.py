@@ -0,0 +1,270 @@
+import os
+import time
+import uuid
+from datetime import datetime
+
+import streamlit as st
+from dotenv import load_dotenv
+from google.api_core.exceptions import GoogleAPIError
+
+from dictionary import DICTIONARY_INDEX, open_dictionary
+from gemini_pool import GeminiClientPool
+from gemini_scheduler import INTERACTIVE, GeminiScheduler, GeminiUnavailable
+from history_store import HistoryStore, incorrect_vocab
+from i18n import LANGUAGES, ui_text
+from profiler import ProfileStore, profiled
+from session_model import SessionSizes, state_sizes
+from singleflight import SingleFlight, prompt_fingerprint
+from srs import ReviewState, ReviewStore, quiz_outcomes, review
+from storage import data_path
+from telemetry import CallTimer, Telemetry, instrument_stream, start_metrics_server
+from translation_cache import TranslationCache
+from vocab_index import VocabIndex, normalize_word
+
+# ==== 全画面で共有するもの ====
+# このモジュールはプロセス内で1回だけ import される。
+# 再実行のたびに作り直す必要のない資源と、どの画面からも使う関数をここに置く。
+
+# ==== Gemini クライアント（プロセス全体で共有） ====
+# 再実行のたびに secrets 読み込み・genai.configure・モデル生成をしないよう、
+# cache_resource でプールを1つだけ作って全セッションで使い回す
+@st.cache_resource
+def get_gemini_pool():
+    api_key = st.secrets.get("GEMINI_API_KEY")
+
+    # ローカル → .env から
+    if not api_key:
+        load_dotenv()
+        api_key = os.getenv("GEMINI_API_KEY")
+
+    if not api_key:
+        return None
+    return GeminiClientPool(api_key, "gemini-1.5-flash")
+
+gemini_pool = get_gemini_pool()
+
+# ==== Gemini 呼び出しスケジューラ（プロセス全体で共有） ====
+# 1分あたりのリクエスト数は環境変数で契約中のクォータに合わせる
+@st.cache_resource
+def get_gemini_scheduler():
+    return GeminiScheduler(
+        requests_per_minute=int(os.getenv("LEXBOT_GEMINI_RPM", "15")),
+        burst=int(os.getenv("LEXBOT_GEMINI_BURST", "5")),
+    )
+
+gemini_scheduler = get_gemini_scheduler()
+
+@st.cache_resource
+def get_gemini_singleflight():
+    return SingleFlight()
+
+gemini_singleflight = get_gemini_singleflight()
+
+# ==== 計測（トークン数・レイテンシ・再試行・パース成否・キャッシュ） ====
+# LEXBOT_METRICS_PORT を設定すると /metrics（Prometheus 形式）と /metrics.json を公開する
+@st.cache_resource
+def get_telemetry():
+    telemetry = Telemetry()
+    telemetry.register_stats("gemini_singleflight", gemini_singleflight.stats)
+    port = os.getenv("LEXBOT_METRICS_PORT")
+    if port:
+        start_metrics_server(telemetry, int(port))
+    return telemetry
+
+telemetry = get_telemetry()
+
+# ==== 再実行プロファイラ（LEXBOT_PROFILE=1 のときだけ） ====
+# 結果は ?admin=profiler&token=<LEXBOT_ADMIN_TOKEN> の画面で見る
+@st.cache_resource
+def get_profile_store():
+    return ProfileStore()
+
+profile_store = get_profile_store()
+
+def admin_token():
+    # 管理画面のトークン: secrets → .env の順。どちらにもなければ管理画面は開けない
+    token = st.secrets.get("LEXBOT_ADMIN_TOKEN")
+    if not token:
+        load_dotenv()
+        token = os.getenv("LEXBOT_ADMIN_TOKEN")
+    return token
+
+def scheduled_generate(prompt, user, priority=INTERACTIVE, stage="other", estimated_prompt_tokens=None, **kwargs):
+    # ワーカースレッドからも呼べる入口（st.* は使わない）。失敗は例外のまま返す
+    # estimated_prompt_tokens はプロンプトを組み立てた時の見積もりで、計測ログにだけ載せる
+    def run():
+        timer = CallTimer(telemetry, stage, gemini_pool.model_name, user, estimated_prompt_tokens)
+
+        def attempt(prompt, **kwargs):
+            timer.attempts += 1
+            return gemini_pool.generate_content(prompt, **kwargs)
+
+        if kwargs.get("stream"):
+            try:
+                timer.response = gemini_scheduler.call(attempt, prompt, user=user, priority=priority, **kwargs)
+            except Exception as e:
+                timer.finish(type(e).__name__)
+                raise
+            # 最初のチャンクまでの時間と全体の時間は、読み進めながら記録する
+            return instrument_stream(timer.response, timer)
+
+        with timer:
+            timer.response = gemini_scheduler.call(attempt, prompt, user=user, priority=priority, **kwargs)
+            timer.first_byte()
+            return timer.response
+
+    if kwargs.get("stream"):
+        # ストリームは1回しか読めないので相乗りさせない
+        return run()
+    # 同じ内容の呼び出しが同時に来たら1回だけ投げて結果を分け合う
+    key = prompt_fingerprint(gemini_pool.model_name, prompt, kwargs.get("generation_config"))
+    return gemini_singleflight.do(key, run)
+
+# ==== セッション初期化 ====
+# 変更されうる値は型（list・dict・VocabIndex）を置き、セッションごとに新しく作る
+SESSION_DEFAULTS = {
+    'stage': 'select-input',
+    'ui_lang': "English",
+    'vocab': VocabIndex, 'quiz': list, 'answers': list,
+    'wordbook': list,
+    'current_flashcard': dict, 'review_queue': None, 'flipped': False,
+    'flashcard_deck': None, 'translation_language': "English",
+    'translation_direction': 'en-to-ja',
+    'quiz_rotation': dict,
+    'deleted_words': list,
+    'page_stack': list,
+    'user_id': None,
+    'is_guest': False,
+    'rerun_count': 0,
+}
+
+def init_session_state():
+    for key, default in SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = default() if callable(default) else default
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+# ==== セッションごとの大きさ（全セッション共有の集計） ====
+SESSION_SIZE_SAMPLE_EVERY = 20  # 何回の再実行ごとに測るか
+
+@st.cache_resource
+def get_session_sizes():
+    return SessionSizes()
+
+session_sizes = get_session_sizes()
+
+def record_session_size():
+    st.session_state.rerun_count += 1
+    if st.session_state.rerun_count % SESSION_SIZE_SAMPLE_EVERY == 1:
+        session_sizes.record(st.session_state.session_id, state_sizes(st.session_state))
+
+# ==== 3. ユーティリティ関数群 ====
+def current_text():
+    return ui_text[st.session_state.ui_lang]
+
+def scheduler_user():
+    return st.session_state.get("user_id") or st.session_state.session_id
+
+def safe_generate_content(prompt, priority=INTERACTIVE, stage="other", **kwargs):
+    # 画面側からの Gemini 呼び出しはすべてここを通す。
+    # 上限に当たってもセッションは止めず、メッセージを出して None を返す
+    if gemini_pool is None:
+        return None
+    try:
+        return scheduled_generate(prompt, scheduler_user(), priority, stage, **kwargs)
+    except GeminiUnavailable:
+        st.error(current_text()["gemini_limit_error"])
+    except GoogleAPIError as e:
+        st.error(f"{current_text()['gemini_request_failed']} {e}")
+    return None
+
+# ==== 翻訳キャッシュ（全セッション共有・ディスク保存） ====
+# Gemini で訳したものと、単語リストの一括取り込みで入った訳を置く
+@st.cache_resource
+def get_translation_cache():
+    cache = TranslationCache(data_path("translations.sqlite3"))
+    # ヒット・ミス・追い出し・期限切れの数を /metrics と管理画面に出す
+    telemetry.register_stats("translation_cache", cache.stats)
+    return cache
+
+translation_cache = get_translation_cache()
+
+# ==== ローカル辞書（同梱の単語リストから作る・読み取り専用） ====
+# 索引はデータフォルダに1回だけ作り、mmap で全セッションから引く
+@st.cache_resource
+def get_dictionary():
+    return open_dictionary(data_path(DICTIONARY_INDEX))
+
+dictionary = get_dictionary()
+
+# ==== 履歴ストア（SQLite・全セッション共有） ====
+# ゲストの記録はタブを閉じると誰も読めなくなるので、起動時に古いものを消す
+GUEST_PREFIX = "guest:"
+GUEST_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+@st.cache_resource
+def get_history_store():
+    store = HistoryStore(data_path("history.sqlite3"))
+    store.expire_users(GUEST_PREFIX, GUEST_MAX_AGE_SECONDS)
+    return store
+
+history_store = get_history_store()
+
+def history_user():
+    # ログインしていればそのユーザー、ゲストはセッションごと（ブラウザのタブを開いている間だけ）。
+    # URL に ID を載せると、アドレスを共有した全員が同じ履歴・復習記録を読み書きしてしまう
+    if st.session_state.get("user_id"):
+        return str(st.session_state.user_id)
+    return f"{GUEST_PREFIX}{st.session_state.session_id}"
+
+@profiled
+def save_history(result):
+    # セッションには保存した ID だけを持ち、過去の受験は必要な時にストアから読む
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    words = st.session_state.vocab.words()
+    attempt_id = history_store.append(
+        history_user(), now,
+        words, st.session_state.quiz, st.session_state.answers, result,
+    )
+    record_quiz_reviews(words, st.session_state.quiz, result)
+    return attempt_id
+
+# ==== 間隔反復の記録（SQLite・全セッション共有） ====
+@st.cache_resource
+def get_review_store():
+    store = ReviewStore(data_path("reviews.sqlite3"))
+    store.expire_users(GUEST_PREFIX, GUEST_MAX_AGE_SECONDS)
+    return store
+
+review_store = get_review_store()
+
+def record_quiz_reviews(words, quiz, result):
+    # クイズの結果もフラッシュカードの出題順に反映する
+    now = time.time()
+    outcomes = quiz_outcomes(words, quiz, incorrect_vocab(words, result))
+    keys = {normalize_word(word): word for word in outcomes}
+    stored = review_store.load(history_user(), keys)
+    vocab, queue = st.session_state.vocab, st.session_state.get("review_queue")
+    updated = []
+    for key, word in keys.items():
+        state = review(stored.get(key) or ReviewState.new(now), outcomes[word], now)
+        updated.append((key, state))
+        word_id = vocab.id_of(word)
+        if queue is not None and word_id in queue:
+            queue.put(word_id, state)
+    review_store.save_many(history_user(), updated)
+
+def render_language_selector(key="ui_lang_selector"):
+    current_lang = st.session_state.get("ui_lang", "English")
+    selected = st.selectbox("🗣 " + ui_text[current_lang]["language_setting"], LANGUAGES, index=LANGUAGES.index(current_lang), key=key)
+    if selected != current_lang:
+        st.session_state.ui_lang = selected
+        st.rerun()
+
+# 2. 画面遷移は必ずこの関数を使う
+def change_stage(new_stage):
+    # 現在の画面を履歴に追加（重複防止）
+    if st.session_state.stage != new_stage:
+        st.session_state.page_stack.append(st.session_state.stage)
+    st.session_state.stage = new_stage
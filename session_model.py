@@ -0,0 +1,138 @@
+import pickle
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from i18n import LANG_CODES
+
+# ==== セッションに置くデータの形 ====
+# 単語は1セッションにつき1回だけ WordTable に登録して番号（ID）で参照する。
+# 単語帳・カードは __slots__ 付きの小さなクラスにし、リストの長さには上限を設ける。
+
+VOCAB_LIMIT = 5000          # 一度に学習できる単語数
+WORDBOOK_LIMIT = 2000       # 単語帳に残す件数（古いものから捨てる）
+WORD_TABLE_LIMIT = 20000    # 1セッションで登録できる単語の種類
+QUIZ_ROTATION_LIMIT = 50    # クイズキャッシュの「前回どれを出したか」を覚えておく件数
+
+BACK_CODES = tuple(LANG_CODES.values())
+
+
+class WordTable:
+    # 単語 ⇔ ID。ID は登録順の連番で、消えない（セッション内で安定）
+    __slots__ = ("_words", "_ids")
+
+    def __init__(self):
+        self._words = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._words)
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def full(self):
+        return len(self._words) >= WORD_TABLE_LIMIT
+
+    def id_for(self, word, key=None):
+        # 未登録なら登録する。上限に達していたら None。
+        # key を渡すと表記ゆれを同じ ID にまとめられる（表示には最初に登録した表記を使う）
+        key = word if key is None else key
+        word_id = self._ids.get(key)
+        if word_id is None:
+            if self.full():
+                return None
+            # 同じ単語の文字列はプロセス全体で1つのオブジェクトを共有する
+            word_id = len(self._words)
+            self._words.append(sys.intern(word))
+            self._ids[sys.intern(key)] = word_id
+        return word_id
+
+    def get_id(self, key):
+        return self._ids.get(key)
+
+    def word(self, word_id):
+        return self._words[word_id]
+
+
+@dataclass
+class WordbookEntry:
+    __slots__ = ("word_id", "added_at")
+    word_id: int
+    added_at: float  # time.time()
+
+
+@dataclass
+class Flashcard:
+    # backs は BACK_CODES の順。まだ訳がなければ None
+    __slots__ = ("word_id", "backs")
+    word_id: int
+    backs: list
+
+    @classmethod
+    def new(cls, word_id, translations=None):
+        translations = translations or {}
+        return cls(word_id, [translations.get(code) for code in BACK_CODES])
+
+    def back(self, code):
+        return self.backs[BACK_CODES.index(code)]
+
+    def set_back(self, code, text):
+        self.backs[BACK_CODES.index(code)] = text or None
+
+
+def add_to_wordbook(wordbook, word_ids, now=None):
+    now = time.time() if now is None else now
+    wordbook.extend(WordbookEntry(word_id, now) for word_id in word_ids)
+    if len(wordbook) > WORDBOOK_LIMIT:
+        del wordbook[:len(wordbook) - WORDBOOK_LIMIT]
+
+
+def trim_mapping(mapping, limit):
+    # 挿入順で古いものから捨てる
+    for key in list(mapping)[:max(0, len(mapping) - limit)]:
+        del mapping[key]
+
+
+# ==== セッションごとの大きさ ====
+def state_sizes(state):
+    # キーごとの大きさ（pickle したバイト数）。pickle できないものは getsizeof で代用
+    sizes = {}
+    for key in list(state.keys()):
+        try:
+            sizes[key] = len(pickle.dumps(state[key], protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            sizes[key] = sys.getsizeof(state[key])
+    return sizes
+
+
+class SessionSizes:
+    # 全セッションの直近の大きさ。しばらく再実行のないセッションは忘れる
+    def __init__(self, idle_seconds=3600):
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def record(self, session_id, sizes):
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (now, sum(sizes.values()), sizes)
+            for sid, (seen, _, _) in list(self._sessions.items()):
+                if now - seen > self.idle_seconds:
+                    del self._sessions[sid]
+
+    def report(self, top=20):
+        with self._lock:
+            sessions = sorted(self._sessions.items(), key=lambda item: item[1][1], reverse=True)
+        rows = []
+        for sid, (seen, total, sizes) in sessions[:top]:
+            largest = max(sizes, key=sizes.get) if sizes else ""
+            rows.append({
+                "session": sid[:8],
+                "kb": round(total / 1024, 1),
+                "largest_key": largest,
+                "largest_kb": round(sizes.get(largest, 0) / 1024, 1),
+                "idle_s": int(time.time() - seen),
+            })
+        return len(sessions), sum(s[1][1] for s in sessions), rows
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+# ==== 同一リクエストの相乗り（single-flight） ====
+# 同じモデル・同じプロンプト・同じ生成設定の呼び出しが同時に来たら、
+# 実際に投げるのは最初の1件だけにして、残りはその結果を待って受け取る。
+
+
+def prompt_fingerprint(model_name, prompt, generation_config=None):
+    if isinstance(prompt, str):
+        prompt = " ".join(prompt.split())
+    payload = json.dumps(
+        [model_name, prompt, generation_config or {}],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self):
+        # leaders = 実際に投げた数、followers = 相乗りして呼び出しを省いた数
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
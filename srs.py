@@ -0,0 +1,201 @@
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+# ==== 間隔反復（SM-2） ====
+# 単語ごとに「易しさ（ease）・間隔（日）・次に出す時刻（due）」を持ち、答え方（0〜5）で更新する。
+# 出す順番は due の小さい順のヒープで決め、次の1枚は O(log n) で取り出す。
+# 状態はユーザー × 単語で SQLite に保存し、次に開いた時も続きから出す。
+
+DAY = 24 * 3600
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+RELEARN_SECONDS = 60  # 間違えた単語は同じ学習の中で少し後にもう一度出す
+
+# 答え方 → SM-2 の quality
+AGAIN = 1  # 分からなかった（めくって「もう一度」・クイズで不正解）
+GOOD = 4   # めくって確かめてから次へ・クイズで正解
+EASY = 5   # めくらずに次へ
+
+
+@dataclass
+class ReviewState:
+    __slots__ = ("ease", "interval", "reps", "lapses", "due")
+    ease: float
+    interval: float  # 日
+    reps: int        # 続けて正解した回数
+    lapses: int
+    due: float       # time.time()
+
+    @classmethod
+    def new(cls, now=None):
+        return cls(DEFAULT_EASE, 0.0, 0, 0, time.time() if now is None else now)
+
+
+def review(state, quality, now=None):
+    # SM-2 の更新式。quality が 3 未満なら最初から覚え直し
+    now = time.time() if now is None else now
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ReviewState(ease, 0.0, 0, state.lapses + 1, now + RELEARN_SECONDS)
+    if state.reps == 0:
+        interval = 1.0
+    elif state.reps == 1:
+        interval = 6.0
+    else:
+        interval = round(state.interval * ease, 1)
+    return ReviewState(ease, interval, state.reps + 1, state.lapses, now + interval * DAY)
+
+
+def quiz_outcomes(words, quiz, missed):
+    # クイズに出た単語（問題文・正解に含まれるもの）→ quality。間違えた単語は AGAIN
+    text = " ".join(f"{q.get('question', '')} {q.get('correctAnswer', '')}" for q in quiz).casefold()
+    missed = {w.casefold() for w in missed}
+    return {
+        w: AGAIN if w.casefold() in missed else GOOD
+        for w in words
+        if w.casefold() in missed or w.casefold() in text
+    }
+
+
+class ReviewQueue:
+    # セッションごとのデッキの出題順。古くなったヒープの要素は取り出す時に捨てる（遅延削除）
+    __slots__ = ("_heap", "_states", "_seq")
+
+    def __init__(self, states=()):
+        # states: (word_id, ReviewState) の並び。due が同じならこの順に出す
+        self._seq = itertools.count()
+        self._states = {}
+        self._heap = []
+        for word_id, state in states:
+            self._states[word_id] = state
+            self._heap.append((state.due, next(self._seq), word_id))
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, word_id):
+        return word_id in self._states
+
+    def __getstate__(self):
+        # itertools.count は pickle できないので、次の番号だけ残す
+        return self._heap, self._states, max((seq for _, seq, _ in self._heap), default=-1) + 1
+
+    def __setstate__(self, data):
+        self._heap, self._states, start = data
+        self._seq = itertools.count(start)
+
+    def state(self, word_id):
+        return self._states.get(word_id)
+
+    def _is_live(self, entry):
+        state = self._states.get(entry[2])
+        return state is not None and state.due == entry[0]
+
+    def _prune(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def peek(self):
+        # 次に出す単語 ID（due が一番早いもの）。空なら None
+        self._prune()
+        return self._heap[0][2] if self._heap else None
+
+    def upcoming(self, count):
+        # 先頭から count 件。取り出してから戻すので O(count log n)
+        taken = []
+        while len(taken) < count:
+            self._prune()
+            if not self._heap:
+                break
+            taken.append(heapq.heappop(self._heap))
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+        return [word_id for _, _, word_id in taken]
+
+    def put(self, word_id, state):
+        self._states[word_id] = state
+        heapq.heappush(self._heap, (state.due, next(self._seq), word_id))
+        # 削除済みの要素が溜まりすぎたら作り直す
+        if len(self._heap) > 2 * len(self._states) + 64:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+
+    def grade(self, word_id, quality, now=None):
+        state = review(self._states.get(word_id) or ReviewState.new(now), quality, now)
+        self.put(word_id, state)
+        return state
+
+    def remove(self, word_id):
+        self._states.pop(word_id, None)
+
+
+class ReviewStore:
+    # ユーザー × 単語（正規化したキー）→ ReviewState（SQLite・全セッション共有）
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reviews ("
+                " user_id TEXT NOT NULL, key TEXT NOT NULL,"
+                " ease REAL NOT NULL, interval REAL NOT NULL, reps INTEGER NOT NULL,"
+                " lapses INTEGER NOT NULL, due REAL NOT NULL, updated_at REAL NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (user_id, key))"
+            )
+            # updated_at が無かった頃のファイルにも列を足す
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(reviews)")}
+            if "updated_at" not in columns:
+                self._db.execute("ALTER TABLE reviews ADD COLUMN updated_at REAL NOT NULL DEFAULT 0")
+            self._db.commit()
+
+    def load(self, user_id, keys, batch_size=500):
+        # 戻り値: {key: ReviewState}。まだ学習していない単語は入らない
+        keys = list(keys)
+        states = {}
+        with self._lock:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                rows = self._db.execute(
+                    "SELECT key, ease, interval, reps, lapses, due FROM reviews"
+                    f" WHERE user_id = ? AND key IN ({','.join('?' * len(batch))})",
+                    [user_id, *batch],
+                ).fetchall()
+                for key, *values in rows:
+                    states[key] = ReviewState(*values)
+        return states
+
+    def save_many(self, user_id, items):
+        # items: (key, ReviewState) の並び。1回のトランザクションで書く
+        now = time.time()
+        rows = [
+            (user_id, key, s.ease, s.interval, s.reps, s.lapses, s.due, now)
+            for key, s in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO reviews (user_id, key, ease, interval, reps, lapses, due, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    def save(self, user_id, key, state):
+        self.save_many(user_id, [(key, state)])
+
+    def expire_users(self, prefix, max_age_seconds):
+        # prefix で始まるユーザー（ゲストなど）の、しばらく更新のない記録を消す
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM reviews WHERE user_id LIKE ? || '%' AND updated_at < ?",
+                (prefix, time.time() - max_age_seconds),
+            )
+            self._db.commit()
+            return cur.rowcount
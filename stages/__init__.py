@@ -0,0 +1,27 @@
+import importlib
+
+# ==== 画面（stage）の登録 ====
+# stage 名 → その画面を描くモジュール。モジュールは初めてその画面に来た時に import し、
+# 各モジュールの render() だけを再実行ごとに呼ぶ。
+
+STAGES = {
+    "select-input": "stages.menu",
+    "main_menu": "stages.menu",
+    "howto": "stages.howto",
+    "input": "stages.input_words",
+    "config": "stages.config",
+    "quiz": "stages.quiz",
+    "results": "stages.results",
+    "flashcard": "stages.flashcard",
+    "history": "stages.history",
+}
+
+DEFAULT_STAGE = "select-input"
+
+
+def stage_module(stage):
+    return importlib.import_module(STAGES.get(stage, STAGES[DEFAULT_STAGE]))
+
+
+def render_stage(stage):
+    stage_module(stage).render()
@@ -0,0 +1,216 @@
+import streamlit as st
+from google.api_core.exceptions import GoogleAPIError
+
+from gemini_scheduler import BACKGROUND, INTERACTIVE
+from i18n import LANG_CODES, LANGUAGES, ui_text
+from profiler import profiled
+from prompt_builder import build_quiz_prompt
+from quiz_cache import QuizCache, quiz_cache_key
+from quiz_generation import (
+    QUIZ_CHUNK_SIZE, decode_quiz_items, generate_quiz_parallel, is_complete_quiz, validate_quiz_item,
+)
+from response_decoding import JSONArrayStreamDecoder
+from session_model import QUIZ_ROTATION_LIMIT, trim_mapping
+from services import current_text, gemini_pool, safe_generate_content, scheduled_generate, scheduler_user, telemetry
+from storage import data_path
+
+# ===== クイズ生成 =====
+@profiled
+def generate_quiz(words, format, context, count, direction=None):
+    if direction is None:
+        direction = st.session_state.get("translation_direction", "en-to-ja")
+    # 戻り値: (プロンプト, 見積もりトークン数)。見積もりは Gemini 呼び出しの計測ログに載せる
+    return build_quiz_prompt(words, format, context, count, direction)
+
+# ===== クイズ1問ぶんの検証 =====
+def prepare_quiz_item(item, idx, format):
+    words = st.session_state.vocab.words()
+    vocab_word = words[idx] if idx < len(words) else "word"
+    checked = validate_quiz_item(item, format, f"{current_text()['your_answer']}: '{vocab_word}'")
+    if checked is None:
+        st.warning(f"⚠️ Question {idx+1} is missing required fields. Possible Gemini response error.")
+    return checked
+
+# ===== チャンク単位のクイズ生成（ワーカースレッドで実行。st.* は呼ばない） =====
+# salvaged にリストを渡すと、壊れた応答を修復して使ったチャンクをそこに記録する
+def make_quiz_chunk_generator(format, context, direction, user, priority=INTERACTIVE, salvaged=None):
+    def generate_chunk(chunk_words, chunk_count):
+        prompt, tokens = generate_quiz(chunk_words, format, context, chunk_count, direction)
+        stage = "quiz_chunk" if priority == INTERACTIVE else "quiz_refill"
+        response = scheduled_generate(prompt, user, priority, stage, estimated_prompt_tokens=tokens)
+        decoded = decode_quiz_items(
+            response.text, format,
+            lambda i: f"'{chunk_words[min(i, len(chunk_words) - 1)]}'",
+        )
+        telemetry.note_parse(stage, bool(decoded.value))
+        if decoded.salvaged:
+            telemetry.note_salvaged(stage, decoded.repairs, decoded.dropped)
+            if salvaged is not None:
+                salvaged.append(stage)
+        return decoded.value or []
+    return generate_chunk
+
+# ===== クイズキャッシュ（全セッション共有・ディスク保存） =====
+@st.cache_resource
+def get_quiz_cache():
+    return QuizCache(data_path("quizzes.sqlite3"))
+
+quiz_cache = get_quiz_cache()
+
+def refill_quiz_cache(cache_key, words, format, context, direction, count):
+    if gemini_pool is None:
+        return
+    user = scheduler_user()
+
+    def generate():
+        # 欠けた・修復したクイズは共有キャッシュに入れない
+        salvaged = []
+        generate_chunk = make_quiz_chunk_generator(format, context, direction, user, BACKGROUND, salvaged)
+        quiz, failed = generate_quiz_parallel(generate_chunk, words, count)
+        return quiz if is_complete_quiz(quiz, count, failed, salvaged) else None
+
+    quiz_cache.refill(cache_key, generate)
+
+# ==== 翻訳方向設定 ====
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+    st.subheader(T["test_settings"])
+
+    # UI上の表示（多言語対応）
+    format_ui = st.selectbox(T["format"], [T["multiple-choice"], T["written"]])
+    context_ui = st.selectbox(T["context"], [T["language-translation"], T["fill-blank"]])
+
+    # 表示→コード（英語）へのマッピング
+    FORMAT_LABELS = {
+        T["multiple-choice"]: "multiple-choice",
+        T["written"]: "free-text"
+    }
+    CONTEXT_LABELS = {
+        T["language-translation"]: "language-translation",
+        T["fill-blank"]: "fill-blank"
+    }
+
+    format = FORMAT_LABELS.get(format_ui, "multiple-choice")
+    context = CONTEXT_LABELS.get(context_ui, "language-translation")
+
+    if context == "language-translation":
+        from_lang = st.selectbox(T["language_from"], LANGUAGES, key="from_lang")
+        to_langs = [l for l in LANGUAGES if l != from_lang]
+        to_lang = st.selectbox(T["language_to"], to_langs, key="to_lang")
+        st.session_state.translation_direction = f"{LANG_CODES[from_lang]}-to-{LANG_CODES[to_lang]}"
+
+    # 重複はすでに除かれているので、プロンプトもトークン数も単語の種類ぶんだけになる
+    words = st.session_state.vocab.words()
+    vocab_count = len(words)
+
+    if vocab_count == 0:
+        st.warning(T["no_vocab_warning"])
+        count = 0
+    else:
+        count = st.number_input(
+            T["start_quiz"],
+            min_value=1,
+            max_value=vocab_count,
+            value=vocab_count,
+            key="quiz_count_input"
+    )
+
+    if st.button(T["start_quiz"], key="start_quiz"):
+        quiz_data = []
+        preview = st.container()
+
+        def show_questions(items):
+            for item in items:
+                quiz_data.append(item)
+                preview.markdown(f"**{len(quiz_data)}.** {item['question']}")
+
+        direction = st.session_state.translation_direction
+        cache_key = quiz_cache_key(words, format, context, direction, int(count))
+        rotation = st.session_state.quiz_rotation
+        cached = quiz_cache.next_variant(cache_key, rotation.get(cache_key))
+        telemetry.note_cache("quiz", cached is not None)
+
+        if cached is not None:
+            # 同じ語彙・設定のクイズが保存済みなら、Gemini を呼ばずに順番に出す
+            rotation[cache_key], quiz_data = cached
+        else:
+            failed_chunks, salvaged = [], []
+            try:
+                if len(words) > QUIZ_CHUNK_SIZE:
+                    # 単語が多いときはチャンクに分けて並列生成し、届いたチャンクから表示する
+                    generate_chunk = make_quiz_chunk_generator(
+                        format, context, direction, scheduler_user(), salvaged=salvaged
+                    )
+                    with st.spinner():
+                        merged, failed_chunks = generate_quiz_parallel(
+                            generate_chunk, words, int(count), on_chunk=show_questions
+                        )
+                    if failed_chunks:
+                        st.warning(f"⚠️ {len(failed_chunks)} part(s) of the quiz could not be generated.")
+                    quiz_data = merged
+                else:
+                    # ストリーミングで受け取り、1問ぶんの JSON が閉じた時点で検証・表示する
+                    prompt, tokens = generate_quiz(words, format, context, int(count))
+                    response = safe_generate_content(
+                        prompt, stage="quiz", estimated_prompt_tokens=tokens, stream=True
+                    )
+                    if response is None:
+                        st.stop()
+                    decoder = JSONArrayStreamDecoder()
+                    received = []
+                    for chunk in response:
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            continue
+                        received.append(text)
+                        for item in decoder.feed(text):
+                            item = prepare_quiz_item(item, len(quiz_data), format)
+                            if item is not None:
+                                show_questions([item])
+                    if not decoder.done:
+                        # 配列が閉じる前に応答が終わった
+                        salvaged.append("truncated")
+
+                    if not quiz_data:
+                        # 逐次パースで1問も取れなかった場合は、全体を修復しながら読み直す
+                        decoded = decode_quiz_items(
+                            "".join(received), format,
+                            lambda i: f"{T['your_answer']}: '{words[i] if i < len(words) else 'word'}'",
+                        )
+                        if decoded.ok:
+                            show_questions(decoded.value)
+                            if decoded.salvaged:
+                                salvaged.append("quiz")
+                                st.info(f"🩹 {len(decoded.value)} question(s) recovered from a damaged response.")
+            except GoogleAPIError as e:
+                st.error(f"{T['gemini_request_failed']} {e}")
+                st.stop()
+
+            telemetry.note_parse("quiz", bool(quiz_data))
+            # 一部しかできなかったクイズを保存すると、受け直した全員に同じ欠けたクイズが出てしまう
+            if is_complete_quiz(quiz_data, int(count), failed_chunks, salvaged):
+                rotation[cache_key] = quiz_cache.add(cache_key, quiz_data)
+
+        if not quiz_data:
+            st.error("❌ Failed to parse quiz JSON. Gemini response format may be invalid.")
+            st.stop()
+
+        # 同じ設定で受け直した時（保存済みのクイズを出した時）だけ、次に備えて裏で作り足す。
+        # 1回きりのクイズのために余分な生成をしてクォータを使わない
+        if cached is not None:
+            refill_quiz_cache(cache_key, list(words), format, context, direction, int(count))
+        trim_mapping(rotation, QUIZ_ROTATION_LIMIT)
+
+        st.session_state.quiz = quiz_data
+        st.session_state.stage = "quiz"
+        st.session_state.format = format
+        st.rerun()
+
+    if st.button("🔙 " + T["back"], key="back_button_in_config"):
+        if st.session_state.get("page_stack"):
+            st.session_state.stage = st.session_state.page_stack.pop()
+            st.rerun()
+        else:
+            st.warning(T["no_history"])
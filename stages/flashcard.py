@@ -0,0 +1,234 @@
+import time
+
+import streamlit as st
+
+from gemini_scheduler import BACKGROUND, INTERACTIVE
+from i18n import LANG_CODES, ui_text
+from prefetch import TranslationPrefetcher
+from profiler import profiled
+from session_model import Flashcard
+from services import (
+    dictionary, gemini_pool, history_user, review_store, safe_generate_content, scheduled_generate, telemetry,
+    translation_cache,
+)
+from srs import AGAIN, EASY, GOOD, ReviewQueue, ReviewState
+from translation_batch import batch_translate
+from vocab_index import normalize_word
+
+# ==== フラッシュカード表示 ====
+LANG_OPTIONS = LANG_CODES
+
+def generate_multilang_flashcards(vocab, source_lang):
+    # カードは単語 ID と訳のリストだけを持つ（表の文字列は VocabIndex にある）。
+    # 訳はまずローカル辞書から入れ、無いものだけ後でキャッシュ・Gemini に頼む。
+    # 学ぶ言語の面は単語そのもの（自分の言語への翻訳を Gemini に頼まない）
+    cards = {}
+    for word_id in vocab.ids():
+        word = vocab.word(word_id)
+        cards[word_id] = Flashcard.new(word_id, {**(dictionary.lookup(word, source_lang) or {}), source_lang: word})
+    return cards
+
+def card_front(card):
+    return st.session_state.vocab.word(card.word_id)
+
+# ==== 出題順（間隔反復） ====
+# 次のカードは due が一番早いもの。前回までの記録はユーザーごとに review_store から読む
+def build_review_queue(vocab):
+    now = time.time()
+    stored = review_store.load(history_user(), (normalize_word(word) for word in vocab.words()))
+    return ReviewQueue(
+        (word_id, stored.get(normalize_word(vocab.word(word_id))) or ReviewState.new(now))
+        for word_id in vocab.ids()
+    )
+
+def grade_card(card, quality):
+    state = st.session_state.review_queue.grade(card.word_id, quality)
+    review_store.save(history_user(), normalize_word(card_front(card)), state)
+
+# ==== Gemini翻訳 ====
+@profiled
+def translate_with_gemini(word, target_lang_code):
+    cached = translation_cache.get(word, target_lang_code)
+    telemetry.note_cache("translate", cached is not None)
+    if cached is not None:
+        return cached
+
+    prompt = f"Translate the word '{word}' into the language code '{target_lang_code}'. Only return the translated word."
+    response = safe_generate_content(prompt, stage="translate")
+    if response is None:
+        return "---"
+    try:
+        result = response.text.strip()
+        translation_cache.put(word, target_lang_code, result)
+        return result
+    except Exception as e:
+        print("❌ Gemini translation failure:", e)
+        return "---"
+
+# ==== デッキの訳を埋める・先読みする ====
+PREFETCH_AHEAD = 5          # 表示中のカードの次に何枚先読みするか
+PREFETCH_WAIT_SECONDS = 2   # めくった時に先読み中なら待つ上限（過ぎたら自分で訳す）
+
+@st.cache_resource
+def get_translation_prefetcher():
+    return TranslationPrefetcher(
+        lambda pending, session_id, priority: batch_translate(
+            lambda prompt: scheduled_generate(prompt, session_id, priority, "translate_batch"),
+            pending,
+            on_parse=lambda ok: telemetry.note_parse("translate_batch", ok),
+        ),
+        translation_cache,
+    )
+
+translation_prefetcher = get_translation_prefetcher()
+
+@profiled
+def fill_flashcard_translations(cards):
+    # 共有キャッシュにある訳だけをその場で埋め、足りない分を {word: {code}} で返す
+    pending = {}
+    for card in cards.values():
+        for code in LANG_OPTIONS.values():
+            if card.back(code) is not None:
+                continue
+            cached = translation_cache.get(card_front(card), code)
+            telemetry.note_cache("flashcard", cached is not None)
+            if cached is not None:
+                card.set_back(code, cached)
+            else:
+                pending.setdefault(card_front(card), set()).add(code)
+    return pending
+
+@profiled
+def prefetch_flashcards(cards, lang_code, pending=None):
+    if gemini_pool is None or not cards:
+        return
+    session_id = st.session_state.session_id
+    # 先に「これから出す N 枚 × 選択中の言語」をすぐめくられてもよいよう対話的な優先度で、
+    # その後にデッキ全体の残りを対話的な呼び出しより後回しで頼む
+    window = [cards[word_id] for word_id in st.session_state.review_queue.upcoming(PREFETCH_AHEAD + 1)]
+    upcoming = {
+        card_front(card): {lang_code}
+        for card in window
+        if card.back(lang_code) is None
+    }
+    if upcoming:
+        translation_prefetcher.prefetch(session_id, upcoming, INTERACTIVE)
+    if pending:
+        translation_prefetcher.prefetch(session_id, pending, BACKGROUND)
+
+# ==== フラッシュカード画面 ====
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+    st.subheader(f"📚 {T['flashcards']}")
+
+    st.session_state.translation_language = st.selectbox(
+        T["select_translation_language"],
+        LANG_OPTIONS.keys(),
+        index=list(LANG_OPTIONS.keys()).index(st.session_state.translation_language)
+    )
+
+    vocab = st.session_state.vocab
+
+    # 単語リストが前回カードを作った時から変わっていれば作り直す（version の比較だけで分かる）
+    if st.session_state.flashcard_deck != vocab.version and len(vocab):
+        st.session_state.flashcard_deck = vocab.version
+        translation_prefetcher.cancel_session(st.session_state.session_id)
+        st.session_state.current_flashcard = generate_multilang_flashcards(
+            vocab, source_lang=st.session_state.translation_direction.split("-to-")[0]
+        )
+        st.session_state.review_queue = build_review_queue(vocab)
+        prefetch_flashcards(
+            st.session_state.current_flashcard,
+            LANG_OPTIONS[st.session_state.translation_language],
+            fill_flashcard_translations(st.session_state.current_flashcard),
+        )
+        st.session_state.flipped = False
+
+    cards = st.session_state.current_flashcard
+
+    if not cards:
+        st.info(T["no_words_entered"])
+    else:
+        queue = st.session_state.review_queue
+        card = cards[queue.peek()]
+        lang_code = LANG_OPTIONS[st.session_state.translation_language]
+
+        # 今日出すべきカードが終わっていれば知らせる（そのまま先の分も続けられる）
+        if queue.state(card.word_id).due > time.time():
+            st.success(T["review_done"])
+
+        if st.session_state.flipped:
+            if card.back(lang_code) is None:
+                # 先読み済みならキャッシュから即座に出る。先読み中なら終わるのを待つ
+                translated = (
+                    translation_prefetcher.wait(card_front(card), lang_code, timeout=PREFETCH_WAIT_SECONDS)
+                    or translate_with_gemini(card_front(card), lang_code)
+                )
+                card.set_back(lang_code, None if translated == "---" else translated)
+            content = card.back(lang_code) or "---"
+        else:
+            content = card_front(card)
+
+        prefetch_flashcards(cards, lang_code)
+
+        st.markdown(f"""
+<div style='
+    border: 3px solid #4CAF50;
+    padding: 24px;
+    border-radius: 16px;
+    background-color: #ccffcc;
+    font-size: 48px;
+    text-align: center;
+    margin: 20px 0;
+    color: black;
+    min-height: 180px;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+'>
+    <strong>{content}</strong>
+</div>
+""", unsafe_allow_html=True)
+
+        # めくらずに次へ = 簡単、めくってから次へ = 正解、「もう一度」= 分からなかった
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button(f"🔄 {T['flip']}", key="flip_flashcard"):
+                st.session_state.flipped = not st.session_state.flipped
+                st.rerun()
+        with col2:
+            if st.session_state.flipped and st.button(f"🔁 {T['again']}", key="again_flashcard"):
+                grade_card(card, AGAIN)
+                st.session_state.flipped = False
+                st.rerun()
+        with col3:
+            if st.button(f"➡ {T['next']}", key="next_flashcard"):
+                grade_card(card, GOOD if st.session_state.flipped else EASY)
+                st.session_state.flipped = False
+                st.rerun()
+
+        if st.button(f"🚫 {T['reset_all']}"):
+            translation_prefetcher.cancel_session(st.session_state.session_id)
+            vocab.clear()
+            st.session_state.flashcard_deck = None
+            st.session_state.current_flashcard = {}
+            st.session_state.review_queue = None
+            st.session_state.flipped = False
+            st.success(T["reset_success"])
+            st.rerun()
+
+        if st.button(f"🗑 {T['delete_word']}"):
+            # 単語リストからは O(1) で消し、カードは訳を残したまま1枚だけ外す
+            removed_word = card_front(card)
+            vocab.remove_id(card.word_id)
+            cards.pop(card.word_id)
+            queue.remove(card.word_id)
+            st.session_state.flashcard_deck = vocab.version
+            st.session_state.flipped = False
+            st.success(f"{T['deleted']}「{removed_word}」")
+            st.rerun()
+
+    if st.button(f"🔙 {T['enter_more_words']}", key="back_from_flashcard"):
+        st.session_state.stage = 'input'
+        st.rerun()
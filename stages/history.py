@@ -0,0 +1,109 @@
+import streamlit as st
+
+from i18n import ui_text
+from profiler import profiled
+from services import history_store, history_user
+
+# ==== 履歴表示 ====
+HISTORY_PAGE_SIZES = [10, 20, 50]
+
+@profiled
+def render_history_details(user, attempt_id, number, T):
+    # 開いた1件だけ、問題と回答の本体をストアから読む
+    h = history_store.get(user, attempt_id)
+    if h is None:
+        return
+    vocab_list = h["vocab"]
+    incorrect_vocab = h["incorrect_words"]
+
+    st.markdown("#### 📋 " + T["questions"])
+    for j, q in enumerate(h["quiz"]):
+        answer = h["answers"][j].get("answer", "") if j < len(h["answers"]) else ""
+        st.markdown(f"**{j+1}. {q.get('question', '')}**")
+        st.markdown(f"*{T['your_answer']}:* {answer}　/　*{T['correct_answer']}:* {q.get('correctAnswer', '')}")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if st.button(f"{T['redo_test']} (#{number})", key=f"redo_all_{attempt_id}"):
+            st.session_state.vocab.replace(vocab_list)
+            st.session_state.stage = 'config'
+            st.rerun()
+    with col2:
+        if incorrect_vocab:
+            if st.button(f"{T['redo_incorrect']} (#{number})", key=f"redo_incorrect_{attempt_id}"):
+                st.session_state.vocab.replace(incorrect_vocab)
+                st.session_state.stage = 'config'
+                st.rerun()
+    with col3:
+        if st.button(f"{T['flashcard_all']}", key=f"flashcard_{attempt_id}"):
+            st.session_state.vocab.replace(vocab_list)
+            st.session_state.stage = 'flashcard'
+            st.rerun()
+
+    with col4:
+        if incorrect_vocab:
+            if st.button(f"{T['flashcard_incorrect']}", key=f"flashcard_incorrect_{attempt_id}"):
+                st.session_state.vocab.replace(incorrect_vocab)
+                st.session_state.stage = 'flashcard'
+                st.rerun()
+
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+    st.subheader(f"🕓 {T['history']}")
+    st.write(T["history_description"])
+
+    user = history_user()
+    total = history_store.count(user)
+
+    if not total:
+        st.info(T["no_history_yet"])
+
+    page_size = st.selectbox(T["page_size"], HISTORY_PAGE_SIZES, key="history_page_size")
+    pages = max(1, -(-total // page_size))
+    page = min(st.session_state.get("history_page", 0), pages - 1)
+    st.session_state.history_page = page
+
+    # 要約（保存時に計算済みのスコア・間違えた単語）を新しい順に1ページぶんだけ読む
+    entries = history_store.page(user, limit=page_size, offset=page * page_size)
+    open_id = st.session_state.get("history_open_id")
+
+    # === 表示（1件につき要約1行 + 詳細ボタン1つ。詳細は開いた1件だけ描く） ===
+    for i, h in enumerate(entries):
+        number = total - page * page_size - i
+        missed = set(h["incorrect_words"])
+        vocab_display = " ".join(f"{word} ✗" if word in missed else f"{word} ✓" for word in h["vocab"])
+
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.markdown(f"**#{number}** 📅 {h['timestamp']}　{h['score']}%　{vocab_display}")
+        with col2:
+            is_open = open_id == h["id"]
+            label = T["hide_details"] if is_open else T["show_details"]
+            if st.button(label, key=f"history_details_{h['id']}"):
+                st.session_state.history_open_id = None if is_open else h["id"]
+                st.rerun()
+
+        if open_id == h["id"]:
+            with st.container(border=True):
+                render_history_details(user, h["id"], number, T)
+
+    if pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ " + T["previous_page"], key="history_prev_page", disabled=page == 0):
+                st.session_state.history_page = page - 1
+                st.rerun()
+        with col2:
+            st.markdown(T["page_of"].format(page=page + 1, pages=pages))
+        with col3:
+            if st.button(T["next_page"] + " ▶", key="history_next_page", disabled=page >= pages - 1):
+                st.session_state.history_page = page + 1
+                st.rerun()
+
+    # 履歴全消去
+    if st.button(T["clear_history"], key="clear_history"):
+        history_store.clear(user)
+        st.session_state.history_page = 0
+        st.session_state.history_open_id = None
+        st.rerun()
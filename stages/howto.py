@@ -0,0 +1,22 @@
+import streamlit as st
+
+from i18n import ui_text
+from profiler import profiled
+
+# ==== How-to Screen ====
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+    st.title(T["howto_title"])
+    st.markdown(f"### {T['howto_1']}")
+    st.markdown(T["howto_1_desc"])
+    st.markdown(f"### {T['howto_2']}")
+    st.markdown(T["howto_2_desc"])
+    st.markdown(f"### {T['howto_3']}")
+    st.markdown(T["howto_3_desc"])
+    st.markdown(f"### {T['howto_4']}")
+    st.markdown(T["howto_4_desc"])
+
+    if st.button("🔙 " + T["back"], key="back_button_in_howto_guide"):
+        st.session_state.stage = "select-input"
+        st.rerun()
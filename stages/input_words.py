@@ -0,0 +1,269 @@
+import hashlib
+import os
+import wave
+
+import streamlit as st
+from PIL import Image, UnidentifiedImageError
+
+from i18n import CODE_TO_LANG_LABELS, LANG_CODES, ui_text
+from image_vocab import ImageVocabExtractor, ImageWordCache
+from profiler import profiled
+from response_decoding import extract_json
+from services import dictionary, safe_generate_content, telemetry, translation_cache
+from session_model import VOCAB_LIMIT, add_to_wordbook
+from storage import data_path
+from vocab_index import parse_terms, split_words
+from vocab_io import (
+    EXPORT_FORMATS, IMPORT_TYPES, VocabImportError, detect_format, iter_import_chunks, write_export,
+)
+from voice_pipeline import SPEECH_LOCALES, VoiceTranscriber, make_engine
+
+# ==== 音声入力（全セッション共有のワーカー） ====
+@st.cache_resource
+def get_voice_transcriber():
+    return VoiceTranscriber(make_engine())
+
+voice_transcriber = get_voice_transcriber()
+
+def learning_lang_code():
+    # 学ぶ言語 = 翻訳方向の「元」の言語
+    return st.session_state.translation_direction.split("-to-")[0]
+
+def submit_voice(audio, T):
+    # 同じ録音で再実行されても二重に投げない
+    data = audio.getvalue()
+    digest = hashlib.sha1(data).hexdigest()
+    if st.session_state.get("voice_audio_digest") == digest:
+        return
+    st.session_state.voice_audio_digest = digest
+    try:
+        job = voice_transcriber.submit(data, SPEECH_LOCALES.get(learning_lang_code(), "en-US"))
+    except (wave.Error, EOFError):
+        st.warning(T["voice_failed"])
+        return
+    st.session_state.voice_job = job.id
+
+# ==== 画像からの単語抽出（結果は画像のハッシュごとに全セッションで共有） ====
+@st.cache_resource
+def get_image_extractor():
+    return ImageVocabExtractor(ImageWordCache(data_path("image_words.sqlite3")))
+
+image_extractor = get_image_extractor()
+
+def gemini_vision_words(image, lang_code):
+    # OCR で読めなかった時だけ使う
+    lang_label = CODE_TO_LANG_LABELS.get(lang_code, "English")
+    prompt = (
+        f"List every {lang_label} vocabulary word that appears in this image, in reading order. "
+        "Return only a JSON array of strings (no explanations or markdown)."
+    )
+    response = safe_generate_content([prompt, image], stage="image_vocab")
+    if response is None:
+        return []
+    decoded = extract_json(response.text, lambda value: isinstance(value, list))
+    ok = isinstance(decoded.value, list)
+    telemetry.note_parse("image_vocab", ok)
+    return split_words(" ".join(str(w) for w in decoded.value)) if ok else []
+
+def extract_image_words(upload, T):
+    # 同じ画像で再実行されても読み直さない
+    data = upload.getvalue()
+    digest = hashlib.sha1(data).hexdigest()
+    if st.session_state.get("image_digest") == digest:
+        return
+    st.session_state.image_digest = digest
+    try:
+        with st.spinner():
+            words, source = image_extractor.extract(data, learning_lang_code(), gemini_vision_words)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        words, source = [], None
+    telemetry.note_cache("image_vocab", source == "cache")
+    if not words:
+        st.warning(T["image_no_words"])
+        return
+    st.session_state.temp_extracted_words = words
+
+# ==== 単語リストの一括取り込み・書き出し ====
+INPUT_LIST_LIMIT = 100  # 入力画面に並べる単語数（それ以上は件数だけ出す）
+
+def import_vocab_file(upload, target_code, T):
+    # 少しずつ読み、500語ごとに単語リスト・単語帳・翻訳キャッシュへまとめて入れる
+    vocab = st.session_state.vocab
+    bar = st.progress(0.0, text=T["import_progress"].format(count=0))
+    added_count = duplicate_count = rejected_count = 0
+    try:
+        for records, fraction in iter_import_chunks(upload, detect_format(upload.name), target_code):
+            added, duplicates, rejected = vocab.add_many(word for word, _ in records)
+            add_to_wordbook(st.session_state.wordbook, added)
+            translation_cache.put_many(
+                (word, code, text) for word, translations in records for code, text in translations.items()
+            )
+            added_count += len(added)
+            duplicate_count += duplicates
+            rejected_count += rejected
+            bar.progress(fraction, text=T["import_progress"].format(count=added_count))
+    except VocabImportError as e:
+        st.error(f"{T['import_failed']} {e}")
+        return
+    if duplicate_count:
+        st.toast(T["duplicates_skipped"].format(count=duplicate_count))
+    if rejected_count:
+        st.toast(T["vocab_limit_reached"].format(limit=VOCAB_LIMIT))
+    st.success(T["import_done"].format(count=added_count))
+
+def export_rows(words):
+    # 訳はローカル辞書、無ければ翻訳キャッシュから
+    lang_code = learning_lang_code()
+    for word in words:
+        translations = dictionary.lookup(word, lang_code) or {}
+        for code in LANG_CODES.values():
+            if code not in translations:
+                cached = translation_cache.get(word, code)
+                if cached and cached != "---":
+                    translations[code] = cached
+        yield word, translations
+
+def show_import_export(T):
+    with st.expander("📦 " + T["import_export"]):
+        target_label = st.selectbox(
+            T["import_translation_language"], list(LANG_CODES),
+            index=list(LANG_CODES.values()).index(st.session_state.translation_direction.split("-to-")[1]),
+            key="import_translation_language",
+        )
+        upload = st.file_uploader(T["import_file"], type=IMPORT_TYPES, key="import_file")
+        if upload is not None and st.button(T["import_button"]):
+            import_vocab_file(upload, LANG_CODES[target_label], T)
+
+        vocab = st.session_state.vocab
+        if not len(vocab):
+            return
+        export_format = st.selectbox(T["export_format"], list(EXPORT_FORMATS), key="export_format")
+        if st.button(T["export_button"]):
+            # 前回の書き出しファイルは消してから作り直す
+            old_path = st.session_state.pop("export_path", None)
+            if old_path and os.path.exists(old_path):
+                os.remove(old_path)
+            st.session_state.export_path = write_export(
+                export_rows(vocab.words()), export_format, LANG_CODES[target_label]
+            )
+        path = st.session_state.get("export_path")
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                st.download_button(
+                    "⬇️ " + T["export_button"], f, key="export_download",
+                    file_name="lexbot_words" + os.path.splitext(path)[1],
+                )
+
+# 文字起こしの途中経過はこの部分だけを1秒ごとに描き直す（画面全体は待たない）
+@st.fragment(run_every=1)
+def show_voice_job(T):
+    job = voice_transcriber.get(st.session_state.get("voice_job"))
+    if job is None:
+        st.session_state.voice_job = None
+        return
+    st.write(job.partial_text())
+    if not job.finished:
+        done, total = job.progress()
+        st.caption(T["voice_transcribing"].format(done=done, total=total))
+        return
+
+    voice_transcriber.discard(job.id)
+    st.session_state.voice_job = None
+    words = split_words(job.partial_text())
+    if not words:
+        st.toast(T["voice_failed"])
+    st.session_state.temp_extracted_words = words
+    st.rerun()
+
+# ==== Word Input Screen ====
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+    st.title("📥 " + T["input_words"])
+
+    vocab = st.session_state.vocab
+    delete_id = None  # ID to delete
+
+    for i, word_id in enumerate(vocab.ids()[:INPUT_LIST_LIMIT]):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.write(f"{i+1}. {vocab.word(word_id)}")
+        with col2:
+            if st.button("❌", key=f"delete_{word_id}"):
+                delete_id = word_id
+    if len(vocab) > INPUT_LIST_LIMIT:
+        st.caption(T["more_words"].format(count=len(vocab) - INPUT_LIST_LIMIT))
+
+    if delete_id is not None:
+        vocab.remove_id(delete_id)
+        st.success(f"{T['delete']} '{vocab.word(delete_id)}'")
+        st.rerun()
+
+    option = st.radio(T["input_method"], (
+        T["manual"], T["Input by voice"], T["Input from camera"], T["Input from history"]))
+
+    # 単語追加と自動遷移処理
+    def handle_word_addition(words):
+        # すでにある単語は入れない。単語帳には新しく入った単語だけを ID で残す
+        added, duplicates, rejected = st.session_state.vocab.add_many(words)
+        if duplicates:
+            st.toast(T["duplicates_skipped"].format(count=duplicates))
+        if rejected:
+            st.toast(T["vocab_limit_reached"].format(limit=VOCAB_LIMIT))
+        add_to_wordbook(st.session_state.wordbook, added)
+
+        st.success(T["add_words"])
+        if st.session_state.get("input_mode") == "test":
+            st.session_state.stage = "config"
+        elif st.session_state.get("input_mode") == "flashcard":
+            st.session_state.stage = "flashcard"
+
+        st.rerun()
+
+    if option == T["manual"]:
+        text = st.text_area(T["input_words"])
+        if st.button(T["add_words"]):
+            handle_word_addition(parse_terms(text))
+
+    if "temp_extracted_words" not in st.session_state:
+        st.session_state.temp_extracted_words = []
+
+    elif option == T["Input from history"]:
+        st.session_state.page_stack = st.session_state.get("page_stack", [])
+        st.session_state.page_stack.append("input_words")
+        st.session_state.stage = "history"
+        st.rerun()
+
+    elif option == T["Input by voice"]:
+        # 録音はブラウザで行い、届いた WAV をワーカーで文字起こしする
+        audio = st.audio_input(T["Voice input"], key="voice_audio")
+        if audio is not None:
+            submit_voice(audio, T)
+        if st.session_state.get("voice_job"):
+            show_voice_job(T)
+
+    elif option == T["Input from camera"]:
+        # 撮影かファイルのどちらか。縮小・OCR はサーバー側でまとめて行う
+        photo = st.camera_input(T["camera_title"], key="camera_image")
+        uploaded = st.file_uploader(T["camera"], type=["png", "jpg", "jpeg", "webp"], key="upload_image")
+        upload = photo or uploaded
+        if upload is not None:
+            extract_image_words(upload, T)
+
+    # 抽出語が存在すれば表示し、追加ボタンを表示
+    if st.session_state.temp_extracted_words:
+        st.markdown(f"### 🔍 {T['extracted_words']}")
+        st.write(st.session_state.temp_extracted_words)
+        if st.button("✅ " + T["add_words"]):
+            words = st.session_state.temp_extracted_words
+            st.session_state.temp_extracted_words = []
+            handle_word_addition(words)
+
+    show_import_export(T)
+
+    if st.button("🔙 " + T["back"], key="back_button_in_input_words"):
+        if st.session_state.get("page_stack"):
+            st.session_state.stage = st.session_state.page_stack.pop()
+            st.rerun()
+        else:
+            st.warning(T["no_history"])
@@ -0,0 +1,18 @@
+import streamlit as st
+
+from i18n import ui_text
+from profiler import profiled
+
+# ==== Main Menu Screen ====
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+
+    st.markdown(
+    f"<h1 style='text-align:center; font-size:48px; color:#4CAF50;'>{T['welcome']}</h1>",
+    unsafe_allow_html=True
+)
+
+    if st.button(f"🔍 {T['see_howto']}"):
+        st.session_state.stage = "howto"
+        st.rerun()
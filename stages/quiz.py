@@ -0,0 +1,26 @@
+import streamlit as st
+
+from i18n import ui_text
+from profiler import profiled
+
+# ==== クイズ画面 ====
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+    st.subheader("📝 " + T["start_quiz"])
+    answers = []
+    for i, q in enumerate(st.session_state.quiz):
+        question_text = q.get("question", "(No question text)")
+        st.write(f"{T['hint']} {i+1}: {question_text}")
+        if st.session_state.format == 'multiple-choice':
+            ans = st.radio(T["your_answer"], q['options'], key=f"q_{i}")
+        else:
+            ans = st.text_input(T["your_answer"], key=f"q_{i}")
+            if 'hint' in q and st.button(f"{T['hint']} {i+1}", key=f"hint_{i}"):
+                st.write(T["hint"] + ":", q['hint'])
+        answers.append({"answer": ans})
+
+    if st.button(T["score"], key="grade_quiz"):
+        st.session_state.answers = answers
+        st.session_state.stage = 'results'
+        st.rerun()
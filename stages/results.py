@@ -0,0 +1,156 @@
+import json
+
+import streamlit as st
+
+from i18n import CODE_TO_LANG_LABELS, LANG_CODES, ui_text
+from local_grader import grade_locally, incorrect_entry, score_percentage
+from profiler import profiled
+from response_decoding import REVIEW_ITEM_SCHEMA, REVIEW_RESULT_SCHEMA, decode_object, schema_problems
+from services import current_text, gemini_pool, safe_generate_content, save_history, telemetry
+
+# ===== 採点 =====
+# 選択式・完全一致はローカルで採点し、判断が必要な記述式だけ Gemini に回す
+@profiled
+def review_with_gemini(quiz, answers, indices):
+    ui_lang_code = LANG_CODES.get(st.session_state.get("ui_lang", "English"), "en")
+    lang_label = CODE_TO_LANG_LABELS.get(ui_lang_code, "English")
+
+    items = [
+        {
+            "index": i,
+            "question": quiz[i].get("question", ""),
+            "correctAnswer": quiz[i].get("correctAnswer", ""),
+            "yourAnswer": answers[i].get("answer", ""),
+        }
+        for i in indices
+    ]
+    prompt = f"""
+The following free-text quiz answers did not exactly match the expected answer.
+For each item, decide whether the learner's answer is still acceptable (a synonym, a valid alternative
+spelling or an equivalent translation), and give short feedback in natural {lang_label}.
+
+Items: {json.dumps(items, ensure_ascii=False)}
+
+Output format (JSON):
+{{
+  "results": [
+    {{
+      "index": number (same as the input item),
+      "correct": boolean,
+      "yourAnswerMeaning": string,
+      "correctMeaning": string,
+      "feedback": string
+    }}
+  ],
+  "overallFeedback": string
+}}
+
+* Output must be a plain JSON object (starting with {{), no markdown, no explanation.
+"""
+
+    response = safe_generate_content(prompt, stage="grade")
+    if response is None:
+        return {}, ""
+    decoded = decode_object(response.text, REVIEW_RESULT_SCHEMA)
+    telemetry.note_parse("grade", decoded.ok)
+    if not decoded.ok:
+        st.warning("⚠️ Could not get feedback from Gemini. Unmatched answers were marked incorrect.")
+        return {}, ""
+
+    reviewed = {}
+    for item in decoded.value["results"]:
+        if not schema_problems(item, REVIEW_ITEM_SCHEMA) and item["index"] in indices:
+            reviewed[item["index"]] = item
+    return reviewed, decoded.value.get("overallFeedback", "")
+
+@profiled
+def grade(quiz, answers, format=None):
+    if format is None:
+        format = st.session_state.get("format", "multiple-choice")
+
+    correct, incorrect, needs_model = grade_locally(quiz, answers, format)
+    overall_feedback = ""
+
+    if needs_model:
+        reviewed, overall_feedback = ({}, "") if gemini_pool is None else review_with_gemini(quiz, answers, needs_model)
+        for i in needs_model:
+            review = reviewed.get(i)
+            if review and review["correct"]:
+                correct += 1
+                continue
+            entry = incorrect_entry(quiz[i], answers[i].get("answer", ""))
+            if review:
+                for key in ("yourAnswerMeaning", "correctMeaning", "feedback"):
+                    entry[key] = review.get(key, "")
+            incorrect.append((i, entry))
+
+    incorrect.sort(key=lambda pair: pair[0])
+    if not overall_feedback:
+        T = current_text()
+        overall_feedback = T["local_feedback"] if incorrect else T["all_correct_feedback"]
+
+    return {
+        "scorePercentage": score_percentage(correct, len(quiz)),
+        "incorrect": [entry for _, entry in incorrect],
+        "overallFeedback": overall_feedback,
+    }
+
+# ==== 結果画面 ====
+@profiled
+def render():
+    T = ui_text[st.session_state.ui_lang]
+
+    if 'result' not in st.session_state or st.session_state.result is None:
+        try:
+            result = grade(st.session_state.quiz, st.session_state.answers)  # ← 修正: grade_quiz → grade
+            st.session_state.result = result
+            st.session_state.attempt_id = save_history(result)
+        except Exception as e:
+            st.error(f"❌ The marking failed: {e}")
+            st.stop()
+    else:
+        result = st.session_state.result
+
+    st.subheader("📊 " + T["result_summary"])
+
+    if isinstance(result, dict) and "scorePercentage" in result:
+        st.write(f"{T['score']}: {result['scorePercentage']}%")
+    else:
+        st.error("❌ The result data format is invalid.")
+        st.write("Contents of debug result:", result)
+        st.stop()
+
+    incorrect_words = []
+
+    for i, item in enumerate(result.get("incorrect", [])):
+        st.write(f"{T['hint']} {i+1}: {item['question']}")
+        st.write(f"- {T['your_answer']}: {item['yourAnswer']} → {item['yourAnswerMeaning']}")
+        st.write(f"- {T['correct_answer']}: {item['correctAnswer']} → {item['correctMeaning']}")
+        st.write(f"- {T['feedback']}: {item['feedback']}")
+        incorrect_words.append(item['correctAnswer'])
+
+    st.write(T["overall_feedback"] + ":")
+    st.write(result["overallFeedback"])
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("🔁 " + T["start_over"], key="restart"):
+            st.session_state.vocab.clear()
+            st.session_state.current_flashcard = {}
+            st.session_state.review_queue = None
+            for key in ['stage', 'quiz', 'answers', 'flipped', 'result']:
+                st.session_state[key] = [] if isinstance(st.session_state.get(key), list) else 0 if isinstance(st.session_state.get(key), int) else False if isinstance(st.session_state.get(key), bool) else 'select-input'
+            st.rerun()
+
+    with col2:
+        if st.button("📘 " + T["review_all"], key="redo_all_words"):
+            st.session_state.stage = 'config'
+            st.session_state.result = None
+            st.rerun()
+
+    with col3:
+        if incorrect_words and st.button("❌ " + T["review_wrong"], key="redo_incorrect_only"):
+            st.session_state.vocab.replace(incorrect_words)
+            st.session_state.stage = 'config'
+            st.session_state.result = None
+            st.rerun()
@@ -0,0 +1,13 @@
+import os
+
+# ==== ローカル保存先 ====
+# キャッシュや履歴など、再起動後も残したいファイルはすべてここに置く。
+# 環境変数 LEXBOT_DATA_DIR で場所を変えられる。
+DATA_DIR_ENV = "LEXBOT_DATA_DIR"
+DEFAULT_DATA_DIR = ".lexbot"
+
+
+def data_path(name):
+    base = os.environ.get(DATA_DIR_ENV, DEFAULT_DATA_DIR)
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, name)
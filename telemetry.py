@@ -0,0 +1,228 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==== Gemini 呼び出しの計測 ====
+# 呼び出しごとにトークン数・最初の応答までの時間・全体の時間・再試行回数を記録し、
+# 1行 JSON のログとして出す。集計はプロセス内に持ち、/metrics で読めるようにする。
+
+logger = logging.getLogger("lexbot.telemetry")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+class _StageStats:
+    __slots__ = ("calls", "errors", "retries", "prompt_tokens", "output_tokens",
+                 "latencies", "ttfbs", "parse_ok", "parse_failed", "cache_hits", "cache_misses")
+
+    def __init__(self, window):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=window)
+        self.ttfbs = deque(maxlen=window)
+        self.parse_ok = 0
+        self.parse_failed = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class Telemetry:
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._stages = defaultdict(lambda: _StageStats(window))
+        self._components = {}  # 名前 -> stats()（キャッシュなどが自分で数えている値）
+
+    def register_stats(self, name, stats):
+        # stats() -> {名前: 数値}。/metrics と管理画面に一緒に出す
+        with self._lock:
+            self._components[name] = stats
+
+    def record_call(self, stage, model, latency, ttfb=None, prompt_tokens=None,
+                    output_tokens=None, retries=0, error=None, user=None, estimated_prompt_tokens=None):
+        with self._lock:
+            stats = self._stages[stage]
+            stats.calls += 1
+            stats.retries += retries
+            stats.prompt_tokens += prompt_tokens or 0
+            stats.output_tokens += output_tokens or 0
+            stats.latencies.append(latency)
+            stats.ttfbs.append(latency if ttfb is None else ttfb)
+            if error is not None:
+                stats.errors += 1
+        logger.info(json.dumps({
+            "event": "gemini_call",
+            "stage": stage,
+            "model": model,
+            "user": user,
+            "latency_ms": round(latency * 1000, 1),
+            "ttfb_ms": round((latency if ttfb is None else ttfb) * 1000, 1),
+            "prompt_tokens": prompt_tokens,
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+            "output_tokens": output_tokens,
+            "retries": retries,
+            "error": error,
+        }, ensure_ascii=False))
+
+    def note_parse(self, stage, ok):
+        with self._lock:
+            if ok:
+                self._stages[stage].parse_ok += 1
+            else:
+                self._stages[stage].parse_failed += 1
+
+    def note_salvaged(self, stage, repairs, dropped):
+        # 壊れた応答を直して使った時の記録（何を直したか・何件捨てたか）
+        logger.info(json.dumps({
+            "event": "parse_salvaged",
+            "stage": stage,
+            "repairs": repairs,
+            "dropped": len(dropped),
+        }, ensure_ascii=False))
+
+    def note_cache(self, stage, hit):
+        with self._lock:
+            if hit:
+                self._stages[stage].cache_hits += 1
+            else:
+                self._stages[stage].cache_misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                stage: {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "retries": s.retries,
+                    "prompt_tokens": s.prompt_tokens,
+                    "output_tokens": s.output_tokens,
+                    "latency_p50_ms": _ms(_percentile(s.latencies, 50)),
+                    "latency_p95_ms": _ms(_percentile(s.latencies, 95)),
+                    "ttfb_p50_ms": _ms(_percentile(s.ttfbs, 50)),
+                    "parse_ok": s.parse_ok,
+                    "parse_failed": s.parse_failed,
+                    "cache_hits": s.cache_hits,
+                    "cache_misses": s.cache_misses,
+                }
+                for stage, s in self._stages.items()
+            }
+
+    def component_snapshot(self):
+        with self._lock:
+            components = dict(self._components)
+        return {name: stats() for name, stats in sorted(components.items())}
+
+    def prometheus(self):
+        lines = []
+        for stage, values in sorted(self.snapshot().items()):
+            for name, value in values.items():
+                if value is not None:
+                    lines.append(f'lexbot_gemini_{name}{{stage="{stage}"}} {value}')
+        for component, values in self.component_snapshot().items():
+            for name, value in values.items():
+                lines.append(f"lexbot_{component}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class CallTimer:
+    # 作った時点から計り始め、finish() で1件ぶんを記録する（with でも使える）
+    def __init__(self, telemetry, stage, model, user=None, estimated_prompt_tokens=None):
+        self.telemetry = telemetry
+        self.stage = stage
+        self.model = model
+        self.user = user
+        self.estimated_prompt_tokens = estimated_prompt_tokens
+        self.attempts = 0
+        self.response = None
+        self.ttfb = None
+        self.started = time.monotonic()
+        self._finished = False
+
+    def first_byte(self):
+        if self.ttfb is None:
+            self.ttfb = time.monotonic() - self.started
+
+    def finish(self, error=None):
+        if self._finished:
+            return
+        self._finished = True
+        prompt_tokens, output_tokens = usage_tokens(self.response)
+        self.telemetry.record_call(
+            self.stage, self.model, time.monotonic() - self.started, self.ttfb,
+            prompt_tokens, output_tokens, max(0, self.attempts - 1), error, self.user,
+            self.estimated_prompt_tokens,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(None if exc_type is None else exc_type.__name__)
+        return False
+
+
+def instrument_stream(response, timer):
+    # ストリームを読みながら、最初のチャンクが来た時刻と最後までの時間を記録する
+    error = None
+    try:
+        for chunk in response:
+            timer.first_byte()
+            yield chunk
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        timer.finish(error)
+
+
+def start_metrics_server(telemetry, port, host="127.0.0.1"):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = telemetry.prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body = json.dumps({"stages": telemetry.snapshot(), "components": telemetry.component_snapshot()})
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="lexbot-metrics", daemon=True).start()
+    return server
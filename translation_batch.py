@@ -0,0 +1,71 @@
+import json
+
+from response_decoding import extract_json
+
+# ==== まとめて翻訳（単語 × 言語を1リクエストで） ====
+# generate には prompt -> response を返す関数（gemini_pool.generate_content など）を渡す。
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def build_batch_prompt(pending):
+    request = {word: sorted(codes) for word, codes in pending.items()}
+    return f"""
+Translate each word into every language code listed for it.
+Return only a JSON object (no markdown, no explanation) shaped like:
+{{"<word>": {{"<language code>": "<translated word>"}}}}
+Use the words exactly as given as the keys.
+
+Words and target language codes:
+{json.dumps(request, ensure_ascii=False)}
+"""
+
+
+def parse_batch_response(text, pending):
+    data = extract_json(text, lambda value: isinstance(value, dict)).value
+    if not isinstance(data, dict):
+        return {}
+
+    # 頼んだ単語・言語のうち、文字列で返ってきたものだけ採用する
+    result = {}
+    for word, codes in pending.items():
+        by_lang = data.get(word)
+        if not isinstance(by_lang, dict):
+            continue
+        for code in codes:
+            value = by_lang.get(code)
+            if isinstance(value, str) and value.strip() and value.strip() != "---":
+                result.setdefault(word, {})[code] = value.strip()
+    return result
+
+
+def batch_translate(generate, pending, chunk_size=20, max_attempts=3, on_parse=None):
+    # pending: {word: {lang_code, ...}}  →  {word: {lang_code: translation}}
+    # on_parse(ok) で応答が読めたかどうかを知らせる（計測用）
+    pending = {word: set(codes) for word, codes in pending.items() if codes}
+    translations = {}
+
+    for _ in range(max_attempts):
+        if not pending:
+            break
+        for chunk in _chunks(list(pending), chunk_size):
+            chunk_pending = {word: pending[word] for word in chunk}
+            try:
+                response = generate(build_batch_prompt(chunk_pending))
+                got = parse_batch_response(response.text, chunk_pending)
+                if on_parse is not None:
+                    on_parse(bool(got))
+            except Exception as e:
+                print("❌ Gemini batch translation failure:", e)
+                got = {}
+            for word, by_lang in got.items():
+                translations.setdefault(word, {}).update(by_lang)
+                pending[word] -= set(by_lang)
+
+        # 次の試行では欠けていた分だけ頼み直す
+        pending = {word: codes for word, codes in pending.items() if codes}
+
+    return translations
@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_DEFAULT_TTL = object()
+
+# ==== 翻訳キャッシュ（全セッション共有） ====
+# メモリ上は LRU + TTL、裏側は SQLite に書き出して再起動後も残す。
+
+
+def normalize_key(word, lang_code):
+    # 大文字小文字・空白・Unicode 正規化の揺れを吸収する
+    text = unicodedata.normalize("NFKC", word or "")
+    text = " ".join(text.split()).casefold()
+    return f"{text}\x1f{(lang_code or '').strip().lower()}"
+
+
+class TranslationCache:
+    def __init__(self, path=None, max_entries=20000, ttl_seconds=30 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            # 期限切れの行は起動時にまとめて捨てる
+            self._db.execute(
+                "DELETE FROM translations WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),),
+            )
+            self._db.commit()
+
+    def _expires_at(self, ttl):
+        return None if ttl is None else time.time() + ttl
+
+    def _remember(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, word, lang_code):
+        key = normalize_key(word, lang_code)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._remember(key, *entry)
+
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is not None and expires_at < now:
+                    self._entries.pop(key, None)
+                    if self._db is not None:
+                        self._db.execute("DELETE FROM translations WHERE key = ?", (key,))
+                        self._db.commit()
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, word, lang_code, value, ttl=_DEFAULT_TTL):
+        if not value or value == "---":
+            return
+        if ttl is _DEFAULT_TTL:
+            ttl = self.ttl_seconds
+        key = normalize_key(word, lang_code)
+        expires_at = self._expires_at(ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._db.commit()
+
+    def put_many(self, items, ttl=_DEFAULT_TTL):
+        # items: (単語, 言語コード, 訳) の並び。一括取り込み用に1回のトランザクションで書く。
+        # メモリ側には載せず、次に get() された時にディスクから読む
+        if ttl is _DEFAULT_TTL:
+            ttl = self.ttl_seconds
+        expires_at = self._expires_at(ttl)
+        rows = [
+            (normalize_key(word, lang_code), value, expires_at)
+            for word, lang_code, value in items
+            if value and value != "---"
+        ]
+        with self._lock:
+            for key, value, _ in rows:
+                if self._db is None:
+                    self._remember(key, value, expires_at)
+                else:
+                    self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO translations (key, value, expires_at) VALUES (?, ?, ?)", rows
+                )
+                self._db.commit()
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,145 @@
+import re
+import unicodedata
+
+from session_model import VOCAB_LIMIT, WordTable
+
+# ==== 学習中の単語リスト（重複なし・順序つき） ====
+# 表記ゆれ（全角半角・大文字小文字・空白）をまとめたキーで1語1つにし、
+# 追加・削除・「入っているか」をどれも O(1) で行う。ID は WordTable の番号で、
+# 一度消して入れ直しても同じ単語なら同じ ID になる。
+
+
+def normalize_word(word):
+    return " ".join(unicodedata.normalize("NFKC", word or "").split()).casefold()
+
+
+_WORD_SPLIT = re.compile(r"[\s、。，,.;:!?！？・()（）「」\"“”]+")
+
+
+def split_words(text):
+    # 音声・画像から取った文章を単語に分ける。文字（と語中の ' -）だけの語を、出てきた順に重複なしで返す
+    words = {}
+    for w in _WORD_SPLIT.split(text or ""):
+        w = w.strip("'-").lower()
+        if w and all(c.isalpha() or c in "'-" for c in w):
+            words.setdefault(w, None)
+    return list(words)
+
+
+TERM_MAX_LENGTH = 64
+_TERM_SPLIT = re.compile(r"[\n\r,;、，；]+")
+
+
+def clean_term(text):
+    # 単語・熟語1つぶんを整える。文字・空白・' - 以外を含むもの、長すぎるものは None
+    term = " ".join(unicodedata.normalize("NFKC", text or "").split()).strip("'-")
+    if not term or len(term) > TERM_MAX_LENGTH:
+        return None
+    if not any(c.isalpha() for c in term):
+        return None
+    if not all(c.isalpha() or c in " '-’" or unicodedata.category(c).startswith("M") for c in term):
+        return None
+    return term
+
+
+def parse_terms(text):
+    # 手入力の単語リスト。改行・カンマ・セミコロンがあればそこで区切って熟語も残し、
+    # なければ空白で区切る。出てきた順に重複なしで返す
+    parts = _TERM_SPLIT.split(text) if _TERM_SPLIT.search(text or "") else (text or "").split()
+    terms = {}
+    for part in parts:
+        term = clean_term(part)
+        if term is not None:
+            terms.setdefault(term.lower(), None)
+    return list(terms)
+
+
+class VocabIndex:
+    __slots__ = ("_table", "_order", "version", "_words")
+
+    def __init__(self, words=()):
+        self._table = WordTable()
+        self._order = {}      # word_id -> None（dict の挿入順で並びを保つ）
+        self.version = 0      # 中身が変わるたびに増える
+        self._words = None    # words() の結果（変わるまで使い回す）
+        self.add_many(words)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self.words())
+
+    def __contains__(self, word):
+        return self._table.get_id(normalize_word(word)) in self._order
+
+    def _changed(self):
+        self.version += 1
+        self._words = None
+
+    def word(self, word_id):
+        return self._table.word(word_id)
+
+    def id_of(self, word):
+        word_id = self._table.get_id(normalize_word(word))
+        return word_id if word_id in self._order else None
+
+    def ids(self):
+        return list(self._order)
+
+    def words(self):
+        if self._words is None:
+            self._words = [self._table.word(word_id) for word_id in self._order]
+        return self._words
+
+    def add(self, word):
+        # 戻り値: (ID, 新しく入ったか)。空・上限超えなら (None, False)
+        key = normalize_word(word)
+        if not key:
+            return None, False
+        word_id = self._table.get_id(key)
+        if word_id in self._order:
+            return word_id, False
+        if len(self._order) >= VOCAB_LIMIT:
+            return None, False
+        word_id = self._table.id_for(word.strip(), key)
+        if word_id is None:
+            return None, False
+        self._order[word_id] = None
+        self._changed()
+        return word_id, True
+
+    def add_many(self, words):
+        # 戻り値: (新しく入った ID, 重複で飛ばした数, 上限で入らなかった数)
+        added, duplicates, rejected = [], 0, 0
+        for word in words:
+            word_id, is_new = self.add(word)
+            if is_new:
+                added.append(word_id)
+            elif word_id is not None:
+                duplicates += 1
+            elif normalize_word(word):
+                rejected += 1
+        return added, duplicates, rejected
+
+    def remove_id(self, word_id):
+        if word_id not in self._order:
+            return False
+        del self._order[word_id]
+        self._changed()
+        return True
+
+    def remove(self, word):
+        word_id = self._table.get_id(normalize_word(word))
+        return word_id is not None and self.remove_id(word_id)
+
+    def clear(self):
+        if self._order:
+            self._order.clear()
+            self._changed()
+
+    def replace(self, words):
+        # 履歴からのやり直しなどで、リストを丸ごと入れ替える（ID は引き継ぐ）
+        self._order.clear()
+        self._changed()
+        self.add_many(words)
@@ -0,0 +1,269 @@
+import csv
+import html
+import io
+import itertools
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+import zlib
+
+from i18n import LANG_CODES
+from vocab_index import clean_term
+
+# ==== 単語リストの一括取り込み・書き出し ====
+# CSV / TSV / JSONL / Anki（テキスト書き出し・.apkg）をファイル全体を読み込まずに少しずつ読み、
+# IMPORT_CHUNK_SIZE 件ずつ (単語, {言語コード: 訳}) のリストとして返す。
+# 書き出しも1行ずつ一時ファイルに書く。
+
+IMPORT_CHUNK_SIZE = 500
+
+IMPORT_TYPES = ["csv", "tsv", "tab", "txt", "jsonl", "ndjson", "apkg"]
+EXPORT_FORMATS = {"csv": ".csv", "tsv": ".tsv", "jsonl": ".jsonl", "anki": ".txt"}
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".tab": "tsv",
+    ".txt": "anki",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".apkg": "apkg",
+}
+
+# 見出し行にあれば「単語」「訳」の列とみなす名前（言語コードの列はその言語の訳）
+WORD_COLUMNS = ("word", "term", "front", "expression", "vocab")
+BACK_COLUMNS = ("translation", "back", "meaning", "definition")
+LANG_COLUMNS = frozenset(LANG_CODES.values())
+HEADER_NAMES = frozenset(WORD_COLUMNS) | frozenset(BACK_COLUMNS) | LANG_COLUMNS
+
+ANKI_SEPARATORS = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "space": " "}
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+class VocabImportError(ValueError):
+    pass
+
+
+def detect_format(filename):
+    return _EXTENSIONS.get(os.path.splitext((filename or "").lower())[1])
+
+
+def _text(value, is_html=False):
+    value = str(value or "")
+    if is_html:
+        value = html.unescape(_TAG.sub(" ", value))
+    return " ".join(value.split())
+
+
+def _record(word, translations, is_html=False):
+    word = clean_term(_text(word, is_html))
+    if word is None:
+        return None
+    translations = {code: _text(text, is_html) for code, text in translations.items()}
+    return word, {code: text for code, text in translations.items() if text}
+
+
+def _rows_to_records(rows, target_code, is_html=False):
+    # 1行目が見出しなら列名で、なければ「1列目=単語・2列目=target_code の訳」で読む
+    word_col, columns = 0, {1: target_code}
+    first = True
+    for row in rows:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if first:
+            first = False
+            if _is_header(row):
+                word_col, columns = _header_columns(row, target_code)
+                continue
+        if len(row) <= word_col:
+            continue
+        record = _record(
+            row[word_col],
+            {code: row[i] for i, code in columns.items() if i < len(row)},
+            is_html,
+        )
+        if record is not None:
+            yield record
+
+
+def _is_header(row):
+    names = {cell.strip().lower() for cell in row}
+    return bool(names & HEADER_NAMES)
+
+
+def _header_columns(row, target_code):
+    names = [cell.strip().lower() for cell in row]
+    word_col = next((i for i, name in enumerate(names) if name in WORD_COLUMNS), 0)
+    columns = {}
+    for i, name in enumerate(names):
+        if i == word_col:
+            continue
+        if name in LANG_COLUMNS:
+            columns[i] = name
+        elif name in BACK_COLUMNS:
+            columns[i] = target_code
+    return word_col, columns
+
+
+class _Progress:
+    # 読み終えた割合（0〜1）。ファイルの読み位置から計算する
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        fileobj.seek(0, os.SEEK_END)
+        self.size = fileobj.tell() or 1
+        fileobj.seek(0)
+
+    def __call__(self):
+        return min(1.0, self.fileobj.tell() / self.size)
+
+
+def _text_stream(fileobj):
+    return io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _read_delimited(stream, delimiter, target_code):
+    return _rows_to_records(csv.reader(stream, delimiter=delimiter), target_code)
+
+
+def _read_jsonl(stream, target_code):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise VocabImportError(f"line {number}: {e.msg}") from None
+        if isinstance(item, str):
+            item = {"word": item}
+        if not isinstance(item, dict):
+            continue
+        word = next((item[k] for k in WORD_COLUMNS if item.get(k)), None)
+        nested = item.get("translations")
+        # {"en": …} の形でなければ（リスト・文字列など）使わない
+        nested = nested if isinstance(nested, dict) else {}
+        translations = {k: v for k, v in nested.items() if k in LANG_COLUMNS}
+        translations.update({k: v for k, v in item.items() if k in LANG_COLUMNS})
+        back = next((item[k] for k in BACK_COLUMNS if item.get(k)), None)
+        if back:
+            translations.setdefault(target_code, back)
+        record = _record(word, translations)
+        if record is not None:
+            yield record
+
+
+def _read_anki_text(stream, target_code):
+    # Anki の「テキストとして書き出し」: 先頭の #separator:… / #html:… 行で形式が決まる
+    delimiter, is_html = "\t", False
+    lines = iter(stream)
+    for line in lines:
+        if not line.startswith("#"):
+            lines = itertools.chain([line], lines)
+            break
+        name, _, value = line[1:].strip().partition(":")
+        if name == "separator":
+            delimiter = ANKI_SEPARATORS.get(value.lower(), value[:1] or "\t")
+        elif name == "html":
+            is_html = value.lower() == "true"
+    return _rows_to_records(csv.reader(lines, delimiter=delimiter), target_code, is_html)
+
+
+def _read_apkg(fileobj, target_code):
+    # .apkg は zip の中の SQLite。ノートの1つ目のフィールドを単語、2つ目を訳として読む
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise VocabImportError(str(e)) from None
+    name = next((n for n in ("collection.anki21", "collection.anki2") if n in archive.namelist()), None)
+    if name is None:
+        raise VocabImportError("unsupported Anki package (export it with 'Support older Anki versions')")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "collection.sqlite3")
+        try:
+            with archive.open(name) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        except (zipfile.BadZipFile, zlib.error) as e:
+            raise VocabImportError(str(e)) from None
+        db = sqlite3.connect(path)
+        try:
+            total = db.execute("SELECT COUNT(*) FROM notes").fetchone()[0] or 1
+            for done, (fields,) in enumerate(db.execute("SELECT flds FROM notes"), 1):
+                parts = fields.split("\x1f")
+                record = _record(parts[0], {target_code: parts[1]} if len(parts) > 1 else {}, is_html=True)
+                if record is not None:
+                    yield record, done / total
+        except sqlite3.Error as e:
+            # 壊れた・Anki のものではないデータベース
+            raise VocabImportError(f"unreadable Anki collection: {e}") from None
+        finally:
+            db.close()
+
+
+def _read_text(fileobj, format, target_code):
+    progress = _Progress(fileobj)
+    stream = _text_stream(fileobj)
+    try:
+        if format == "csv":
+            reader = _read_delimited(stream, ",", target_code)
+        elif format == "tsv":
+            reader = _read_delimited(stream, "\t", target_code)
+        elif format == "jsonl":
+            reader = _read_jsonl(stream, target_code)
+        else:
+            reader = _read_anki_text(stream, target_code)
+        for record in reader:
+            yield record, progress()
+    finally:
+        # アップロードされたファイル自体は閉じない
+        stream.detach()
+
+
+def iter_import_chunks(fileobj, format, target_code, chunk_size=IMPORT_CHUNK_SIZE):
+    # 戻り値: (レコードのリスト, 読み終えた割合) を chunk_size 件ごとに返すジェネレーター
+    if format == "apkg":
+        records = _read_apkg(fileobj, target_code)
+    elif format in ("csv", "tsv", "jsonl", "anki"):
+        records = _read_text(fileobj, format, target_code)
+    else:
+        raise VocabImportError(f"unsupported file type: {format}")
+
+    chunk = []
+    try:
+        for record, fraction in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk, fraction
+                chunk = []
+    except csv.Error as e:
+        raise VocabImportError(str(e)) from None
+    yield chunk, 1.0
+
+
+def write_export(rows, format, target_code, directory=None):
+    # rows: (単語, {言語コード: 訳}) の並び。一時ファイルに1行ずつ書き、そのパスを返す
+    handle = tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="", suffix=EXPORT_FORMATS[format],
+        prefix="lexbot_deck_", dir=directory, delete=False,
+    )
+    codes = list(LANG_CODES.values())
+    with handle as f:
+        if format in ("csv", "tsv"):
+            writer = csv.writer(f, delimiter="," if format == "csv" else "\t")
+            writer.writerow(["word"] + codes)
+            for word, translations in rows:
+                writer.writerow([word] + [translations.get(code, "") for code in codes])
+        elif format == "jsonl":
+            for word, translations in rows:
+                f.write(json.dumps({"word": word, "translations": translations}, ensure_ascii=False) + "\n")
+        else:
+            f.write("#separator:tab\n#html:false\n")
+            writer = csv.writer(f, delimiter="\t")
+            for word, translations in rows:
+                writer.writerow([word, translations.get(target_code, "")])
+    return handle.name
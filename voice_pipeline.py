@@ -0,0 +1,178 @@
+import io
+import os
+import threading
+import uuid
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+# ==== 音声入力（ブラウザで録音 → サーバーで文字起こし） ====
+# 録音はブラウザ側（st.audio_input）で行い、届いた WAV を数秒ごとのチャンクに分けて
+# ワーカースレッドで文字起こしする。画面側はジョブの途中経過を読むだけで待たない。
+# 認識エンジンは差し替え可能（LEXBOT_SPEECH_ENGINE=google / sphinx）。
+#
+# 手元で録音済みの WAV を試す:
+#   python voice_pipeline.py sample.wav --engine sphinx --locale en-US
+
+CHUNK_SECONDS = 10
+MAX_JOBS = 256
+
+# 学ぶ言語のコード → 認識エンジンに渡すロケール
+SPEECH_LOCALES = {
+    "en": "en-US",
+    "ja": "ja-JP",
+    "zh": "zh-CN",
+    "ko": "ko-KR",
+    "es": "es-ES",
+}
+
+
+class GoogleWebEngine:
+    # Google の Web Speech API（ネットワークが必要）
+    name = "google"
+
+    def __init__(self):
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, audio, locale):
+        return self._recognizer.recognize_google(audio, language=locale)
+
+
+class SphinxEngine:
+    # CMU Sphinx（pocketsphinx をインストールすればオフラインで動く）
+    name = "sphinx"
+
+    def __init__(self):
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, audio, locale):
+        return self._recognizer.recognize_sphinx(audio, language=locale)
+
+
+ENGINES = {
+    GoogleWebEngine.name: GoogleWebEngine,
+    SphinxEngine.name: SphinxEngine,
+}
+
+
+def make_engine(name=None):
+    name = name or os.getenv("LEXBOT_SPEECH_ENGINE", GoogleWebEngine.name)
+    return ENGINES[name]()
+
+
+def split_wav(wav_bytes, chunk_seconds=CHUNK_SECONDS):
+    # PCM の WAV を chunk_seconds ごとの sr.AudioData に分ける
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav:
+        rate, width, channels = wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+        frames_per_chunk = max(1, int(rate * chunk_seconds))
+        chunks = []
+        while True:
+            frames = wav.readframes(frames_per_chunk)
+            if not frames:
+                break
+            if channels > 1:
+                frames = _first_channel(frames, width, channels)
+            chunks.append(sr.AudioData(frames, rate, width))
+    return chunks
+
+
+def _first_channel(frames, width, channels):
+    # 認識エンジンはモノラル前提なので、最初のチャンネルだけ取り出す
+    step = width * channels
+    return b"".join(frames[i:i + width] for i in range(0, len(frames), step))
+
+
+class TranscriptionJob:
+    def __init__(self, chunk_count):
+        self.id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._texts = [None] * chunk_count
+        self.errors = []
+
+    def _set(self, index, text, error=None):
+        with self._lock:
+            self._texts[index] = text
+            if error:
+                self.errors.append(error)
+
+    @property
+    def finished(self):
+        with self._lock:
+            return all(t is not None for t in self._texts)
+
+    def progress(self):
+        with self._lock:
+            return sum(t is not None for t in self._texts), len(self._texts)
+
+    def partial_text(self):
+        # 先頭から続けて終わっているチャンクぶんだけを順番どおりにつなぐ
+        with self._lock:
+            done = []
+            for text in self._texts:
+                if text is None:
+                    break
+                done.append(text)
+        return " ".join(t for t in done if t)
+
+
+class VoiceTranscriber:
+    def __init__(self, engine, max_workers=2, chunk_seconds=CHUNK_SECONDS):
+        self.engine = engine
+        self.chunk_seconds = chunk_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voice")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, wav_bytes, locale):
+        chunks = split_wav(wav_bytes, self.chunk_seconds)
+        job = TranscriptionJob(len(chunks))
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_JOBS:
+                self._jobs.popitem(last=False)
+        for index, audio in enumerate(chunks):
+            self._executor.submit(self._run, job, index, audio, locale)
+        return job
+
+    def _run(self, job, index, audio, locale):
+        try:
+            job._set(index, self.engine.transcribe(audio, locale))
+        except sr.UnknownValueError:
+            # 無音・聞き取れない部分は空として進める
+            job._set(index, "")
+        except Exception as e:
+            print("❌ Voice transcription failed:", e)
+            job._set(index, "", error=str(e))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from vocab_index import split_words
+
+    parser = argparse.ArgumentParser(description="Transcribe a recorded WAV file with a LexBot speech engine.")
+    parser.add_argument("wav")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=None)
+    parser.add_argument("--locale", default="en-US")
+    args = parser.parse_args()
+
+    with open(args.wav, "rb") as f:
+        transcriber = VoiceTranscriber(make_engine(args.engine))
+        job = transcriber.submit(f.read(), args.locale)
+    while not job.finished:
+        time.sleep(0.2)
+    print(job.partial_text())
+    print(split_words(job.partial_text()))
+    for error in job.errors:
+        print("error:", error)